@@ -1,3 +1,15 @@
-from django.contrib import admin
+from .decorators import reads_from_replica
 
-# Register your models here.
+
+class ReplicaChangeListMixin:
+    """
+    ModelAdmin mixin: list pages read from the reporting replica (see
+    core.replica) while it is at most `changelist_max_staleness` seconds
+    old. Actions, edit forms and saves stay on the primary.
+    """
+
+    changelist_max_staleness = 60
+
+    def changelist_view(self, request, extra_context=None):
+        view = reads_from_replica(self.changelist_max_staleness)(super().changelist_view)
+        return view(request, extra_context)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from .db import apply_pragmas
+
+        connection_created.connect(apply_pragmas, dispatch_uid="core-sqlite-pragmas")
@@ -0,0 +1,59 @@
+"""
+SQLite connection tuning.
+
+A database entry can carry a "PRAGMAS" dict; apply_pragmas runs each one on
+every new connection (wired to connection_created in CoreConfig.ready).
+Other backends ignore it. PRODUCTION_SQLITE is the profile sms.settings.prod
+uses; bench_sqlite compares it with SQLite's defaults. REPLICA_SQLITE is
+for the read-only "reporting" snapshot (core.replica).
+"""
+
+PRODUCTION_PRAGMAS = {
+    # Readers see a snapshot and never block the writer, or vice versa
+    "journal_mode": "wal",
+    # Wait up to 5s for the write lock instead of failing with "database is locked"
+    "busy_timeout": 5000,
+    # Safe with WAL: a power cut can lose the last commits, never corrupt the file
+    "synchronous": "normal",
+    # Read the file through a 256 MiB memory map, and keep ~64 MiB of pages per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+}
+
+PRODUCTION_SQLITE = {
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "OPTIONS": {
+        # Take the write lock when a transaction starts, so a transaction that
+        # reads then writes waits for its turn (busy_timeout) instead of
+        # failing mid-way when another writer got in first
+        "transaction_mode": "IMMEDIATE",
+    },
+    "PRAGMAS": PRODUCTION_PRAGMAS,
+}
+
+REPLICA_SQLITE = {
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "PRAGMAS": {
+        # Refuse writes: the snapshot is rewritten wholesale by refresh_replica
+        "query_only": 1,
+        # Wait out a refresh instead of failing
+        "busy_timeout": PRODUCTION_PRAGMAS["busy_timeout"],
+        "mmap_size": PRODUCTION_PRAGMAS["mmap_size"],
+        "cache_size": PRODUCTION_PRAGMAS["cache_size"],
+        "temp_store": "memory",
+    },
+    # Tests read everything from the test copy of "default"
+    "TEST": {"MIRROR": "default"},
+}
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,80 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from .replica import current_staleness, reading_replica, serving_under
+
+
+def query_budget(max_queries=None, **per_method):
+    """
+    Declare the most SQL queries a view may run per request, counting the
+    session/auth queries the middleware stack makes too.
+
+    `max_queries` is the budget for GET and HEAD; other methods declare
+    their own by keyword, e.g. @query_budget(9, post=12), since a write
+    (locks, savepoints, the catalog version bump) costs more than the page
+    it redirects back to. Methods without a budget aren't checked.
+
+    Enforced in tests by core.testing.QueryBudgetMixin and reported at
+    runtime by core.middleware.SQLBudgetMiddleware.
+    """
+    budgets = {method.upper(): count for method, count in per_method.items()}
+    if max_queries is not None:
+        budgets.setdefault("GET", max_queries)
+        budgets.setdefault("HEAD", max_queries)
+
+    def decorator(view_func):
+        view_func.query_budget = budgets
+        return view_func
+    return decorator
+
+
+def budget_for(view_func, method):
+    """The @query_budget `view_func` declared for HTTP `method`, or None."""
+    return getattr(view_func, "query_budget", {}).get(method.upper())
+
+
+_DONE = object()
+
+
+def reads_from_replica(max_staleness):
+    """
+    Serve a read-only view's GET and HEAD requests from the reporting
+    replica (core.replica) while its copy is at most `max_staleness` seconds
+    old; otherwise, and for every other method, from the primary.
+
+    Streamed responses (CSV exports) keep reading from the replica while
+    they stream. Goes below @query_budget, which labels the outermost view.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view_func(request, *args, **kwargs)
+                with reading_replica(max_staleness):
+                    return await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return view_func(request, *args, **kwargs)
+                with reading_replica(max_staleness):
+                    response = view_func(request, *args, **kwargs)
+                    staleness = current_staleness()
+                if response.streaming:
+                    response.streaming_content = _streamed(response.streaming_content, staleness)
+                return response
+        return wrapper
+    return decorator
+
+
+def _streamed(chunks, staleness):
+    # Chunks are produced after the view returned: read them from wherever the view did
+    chunks = iter(chunks)
+    while True:
+        with serving_under(staleness):
+            chunk = next(chunks, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
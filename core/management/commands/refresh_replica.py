@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.replica import REPLICA_ALIAS, refresh_replica, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database into the read-only reporting snapshot with the "
+        "online backup API, once or every --every seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=float,
+            help="Keep refreshing on this period; keep it under the views' max_staleness",
+        )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(f'No "{REPLICA_ALIAS}" database is configured')
+
+        while True:
+            try:
+                pages, seconds = refresh_replica()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(json.dumps({
+                "replica": str(connections[REPLICA_ALIAS].settings_dict["NAME"]),
+                "refreshed_at": timezone.now().isoformat(),
+                "pages": pages,
+                "seconds": round(seconds, 3),
+            }))
+            if not options["every"]:
+                return
+            time.sleep(max(options["every"] - seconds, 0))
@@ -0,0 +1,112 @@
+import json
+import logging
+import time
+
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from .decorators import budget_for
+
+logger = logging.getLogger("sms.sql")
+
+
+class QueryStats:
+    """execute_wrapper that counts and times every statement it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()  # (sql, params) -> executions
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """Statements run more than once with identical parameters."""
+        return {sql: n for (sql, _), n in self.statements.items() if n > 1}
+
+
+class SQLBudgetMiddleware:
+    """
+    Records query count, total SQL time and duplicated statements per request.
+
+    The numbers go out in a Server-Timing header (visible in the browser's
+    network panel) and one JSON log line on the "sms.sql" logger. Views
+    decorated with core.decorators.query_budget log a warning when they go
+    over budget.
+
+    Works in both sync and async stacks. Under ASGI the ORM runs in the
+    request's sync thread, so the wrappers are installed there.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = QueryStats()
+        request.query_budget = None
+
+        with ExitStack() as stack:
+            self._instrument(stack, stats)
+            response = self.get_response(request)
+        return self._report(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        request.query_budget = None
+
+        stack = ExitStack()
+        await sync_to_async(self._instrument)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._report(request, response, stats)
+
+    def _instrument(self, stack, stats):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def _report(self, request, response, stats):
+        duplicates = stats.duplicates
+        timing = f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+
+        budget = request.query_budget
+        over_budget = budget is not None and stats.count > budget
+        record = {
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "queries": stats.count,
+            "sql_ms": round(stats.duration * 1000, 2),
+            "duplicates": sum(duplicates.values()) - len(duplicates),
+            "budget": budget,
+        }
+        if over_budget:
+            record["duplicated_sql"] = list(duplicates)[:5]
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = budget_for(view_func, request.method)
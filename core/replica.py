@@ -0,0 +1,122 @@
+"""
+Reporting replica: reads for reports and dashboards off the primary.
+
+The "reporting" database alias is a read-only copy of "default". On SQLite
+it is a snapshot file that `manage.py refresh_replica` rewrites with the
+online backup API on a schedule; its modification time is the moment the
+copy was taken. Elsewhere it can be a real streaming replica.
+
+Views opt in with core.decorators.reads_from_replica(max_staleness). For the
+length of the request, ReportingRouter sends inventory reads to the replica
+if the snapshot is no older than that bound, and to the primary otherwise.
+Writes, and every read inside a transaction on the primary (Sale.save,
+select_for_update), always go to the primary.
+"""
+import os
+import sqlite3
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "reporting"
+
+# max_staleness of the request being served from the replica, else None
+_staleness = ContextVar("replica_staleness", default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.settings
+
+
+def replica_age():
+    """Seconds since the replica was copied from the primary, or None if there is no usable copy."""
+    if not replica_configured():
+        return None
+    replica = connections[REPLICA_ALIAS]
+    if replica.vendor != "sqlite":
+        return 0.0  # a streaming replica: its lag is the database's business
+    try:
+        return max(time.time() - os.stat(replica.settings_dict["NAME"]).st_mtime, 0.0)
+    except (OSError, TypeError):
+        return None  # never refreshed, or an in-memory (test) database
+
+
+def current_staleness():
+    """The staleness bound reads are being served under, or None when they go to the primary."""
+    return _staleness.get()
+
+
+@contextmanager
+def reading_replica(max_staleness):
+    """Route reads to the replica inside the block if it is at most `max_staleness` seconds old."""
+    age = replica_age()
+    with serving_under(max_staleness if age is not None and age <= max_staleness else None):
+        yield
+
+
+@contextmanager
+def serving_under(staleness):
+    """Re-enter a decision reading_replica already made (None: the primary)."""
+    token = _staleness.set(staleness)
+    try:
+        yield
+    finally:
+        _staleness.reset(token)
+
+
+def refresh_replica():
+    """
+    Copy the primary into the replica file with SQLite's online backup API.
+
+    Writers keep going while the copy is taken; replica readers, including
+    persistent connections, see the new copy on their next query. Returns
+    (pages, seconds taken).
+    """
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA_ALIAS]
+    if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+        raise ValueError("Snapshots are for SQLite; point the reporting alias at a real replica instead")
+
+    started = time.time()
+    primary.ensure_connection()
+    target = sqlite3.connect(replica.settings_dict["NAME"])
+    try:
+        # One step, so readers never see a half-copied file
+        primary.connection.backup(target)
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        target.close()
+    # Stamp the copy with when it was taken, not when it finished
+    os.utime(replica.settings_dict["NAME"], (started, started))
+    return pages, time.time() - started
+
+
+class ReportingRouter:
+    """
+    Sends reads of route_app_labels models to the replica while a view is
+    being served from it (see reading_replica). Sessions and users always
+    read from the primary, so a login newer than the snapshot still works.
+    """
+
+    route_app_labels = {"inventory"}
+
+    def db_for_read(self, model, **hints):
+        if (
+            _staleness.get() is not None
+            and model._meta.app_label in self.route_app_labels
+            # Reads that feed a write see the primary's current rows
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the same rows either way
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import resolve
+
+from .decorators import budget_for
+
+
+class QueryBudgetMixin:
+    """TestCase mixin that fails when a request runs more queries than its view's @query_budget for that method."""
+
+    def assertWithinQueryBudget(self, url, data=None, method="get"):
+        budget = budget_for(resolve(url).func, method)
+        if budget is None:
+            self.fail(f"{url} has no @query_budget declared for {method.upper()}")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data)
+            if hasattr(response, "streaming_content"):
+                b"".join(response.streaming_content)
+
+        queries = [query["sql"] for query in ctx.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{url} ran {len(queries)} queries, budget is {budget}:\n" + "\n".join(queries),
+        )
+        return response
+
+
+@contextmanager
+def throwaway_database(file_backed=False):
+    """
+    Create a migrated scratch copy of the default database for management
+    commands (benchmarks, stress runs) and drop it afterwards.
+
+    SQLite test databases live in memory; pass file_backed=True when several
+    threads must share it through their own connections.
+    """
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_name, old_test_name = connection.settings_dict["NAME"], test_settings.get("NAME")
+    if file_backed and connection.vendor == "sqlite":
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        test_settings["NAME"] = path
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        test_settings["NAME"] = old_test_name
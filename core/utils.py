@@ -1,9 +1,26 @@
 import os
+from datetime import datetime, time, timedelta
 from uuid import uuid4
 
+from django.utils import timezone
+
 def profile_image_upload(instance, filename):
     """Upload path: media/profiles/<username>/<uuid>.<ext>"""
     ext = filename.split('.')[-1]
     unique_name = f"{uuid4().hex}.{ext}"
     return os.path.join("profiles", instance.username, unique_name)
 
+
+def local_day_range(first_day=None, last_day=None):
+    """
+    Aware datetime bounds [start, end) covering whole local days.
+
+    Filtering on `field__gte=start, field__lt=end` keeps index range scans
+    usable, unlike `field__date=` which wraps the column in a function.
+    """
+    start = end = None
+    if first_day:
+        start = timezone.make_aware(datetime.combine(first_day, time.min))
+    if last_day:
+        end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, end
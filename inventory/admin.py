@@ -1,13 +1,18 @@
 from django.contrib import admin
-from .models import Category, Product, StockEntry, Sale
+
+from core.admin import ReplicaChangeListMixin
+from .models import (
+    Category, Product, StockEntry, Sale, DailySalesSummary, ProductForecast, StockMovement,
+)
 
 
 # 1. Category
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "parent")
+    list_display = ("full_name", "parent")
     search_fields = ("name",)
     list_filter = ("parent",)
+    ordering = ("full_name",)
 
 
 # 2. Product
@@ -21,7 +26,7 @@ class ProductAdmin(admin.ModelAdmin):
 
 # 3. StockEntry
 @admin.register(StockEntry)
-class StockEntryAdmin(admin.ModelAdmin):
+class StockEntryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ("product", "quantity", "buying_price", "date_added", "added_by")
     search_fields = ("product__name",)
     list_filter = ("date_added", "added_by")
@@ -30,7 +35,7 @@ class StockEntryAdmin(admin.ModelAdmin):
 
 # 4. Sale
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = (
         "product", "quantity", "selling_price",
         "date_sold", "sold_by", "payment_status",
@@ -39,3 +44,50 @@ class SaleAdmin(admin.ModelAdmin):
     search_fields = ("product__name", "sold_by__username")
     list_filter = ("date_sold", "sold_by", "payment_status")
     ordering = ("-date_sold",)
+
+
+# 5. Daily sales rollup (maintained by Sale.save)
+@admin.register(DailySalesSummary)
+class DailySalesSummaryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = (
+        "day", "product", "vendor", "payment_status",
+        "sales_count", "units", "revenue", "cost", "profit",
+    )
+    list_filter = ("day", "payment_status")
+    list_select_related = ("product", "vendor__role")
+    ordering = ("-day",)
+
+
+# 6. Demand forecasts (written by manage.py forecast)
+@admin.register(ProductForecast)
+class ProductForecastAdmin(admin.ModelAdmin):
+    list_display = (
+        "product", "moving_average", "smoothed_velocity",
+        "days_of_cover", "reorder_quantity", "computed_at",
+    )
+    list_select_related = ("product",)
+    search_fields = ("product__name",)
+    ordering = ("days_of_cover",)
+
+
+# 7. Stock movement ledger (append-only)
+@admin.register(StockMovement)
+class StockMovementAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = (
+        "occurred_at", "product", "kind", "quantity_delta",
+        "unit_cost", "balance_quantity", "average_cost",
+    )
+    list_filter = ("kind", "occurred_at")
+    list_select_related = ("product",)
+    search_fields = ("product__name",)
+    ordering = ("-occurred_at", "-id")
+
+    # Movements are written by the stock-changing models only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,133 @@
+"""
+Versioned caching for computed dashboard and catalog blocks.
+
+Every block depends on one or more groups ("sales", "stock", "catalog",
+"users"). A group's version is part of the block's cache key, so bumping
+the version (see inventory.signals) makes every dependent block miss on
+its next read without having to know or delete its keys.
+
+A bump writes a fresh random version rather than cache.incr(): incr is a
+read-then-write on FileBasedCache (production), so two processes bumping
+at once could lose one, or a slow one could put back an older number
+whose blocks were cached before the other's write. A version that was
+never used before has no blocks under it, whichever bump lands last.
+
+acached_block is the same for async views, using the cache's async API.
+
+A block computed from the reporting replica may miss the very write that
+bumped its version, so it is only kept for the view's staleness bound.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.replica import current_staleness
+
+BLOCK_TIMEOUT = 60 * 15
+GROUPS = ("sales", "stock", "catalog", "users")
+
+_MISSING = object()
+
+
+def _version_key(group):
+    return f"inventory:version:{group}"
+
+
+def _versions(groups):
+    keys = [_version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from a timestamp so an evicted counter never reuses an old version
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def _aversions(groups):
+    keys = [_version_key(group) for group in groups]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def _block_key(name, versions, suffix):
+    return f"inventory:block:{name}:{'.'.join(str(v) for v in versions)}:{suffix}"
+
+
+def _timeout(timeout):
+    staleness = current_staleness()
+    return timeout if staleness is None else min(timeout, staleness)
+
+
+def _count(outcome):
+    key = f"inventory:stats:{outcome}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, 1, None)
+
+
+async def _acount(outcome):
+    key = f"inventory:stats:{outcome}"
+    await cache.aadd(key, 0, None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+def cached_block(name, groups, compute, suffix="", timeout=BLOCK_TIMEOUT):
+    """Return the cached value of `name`, computing and storing it on a miss."""
+    key = _block_key(name, _versions(groups), suffix)
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count("hits")
+        return value
+
+    _count("misses")
+    value = compute()
+    cache.set(key, value, _timeout(timeout))
+    return value
+
+
+async def acached_block(name, groups, compute, suffix="", timeout=BLOCK_TIMEOUT):
+    """cached_block for async views; `compute` is a coroutine function."""
+    key = _block_key(name, await _aversions(groups), suffix)
+
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        await _acount("hits")
+        return value
+
+    await _acount("misses")
+    value = await compute()
+    await cache.aset(key, value, _timeout(timeout))
+    return value
+
+
+def invalidate(*groups):
+    """Bump the given groups' versions once the current transaction commits."""
+    def bump():
+        cache.set_many({_version_key(group): uuid.uuid4().hex for group in groups}, None)
+
+    transaction.on_commit(bump)
+
+
+def stats():
+    """Hit/miss counters across all processes sharing the cache."""
+    hits = cache.get("inventory:stats:hits", 0)
+    misses = cache.get("inventory:stats:misses", 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else None,
+    }
@@ -0,0 +1,138 @@
+"""
+Streamed CSV exports of sales, stock entries and purchase orders.
+
+Rows come from values_list(...).iterator(chunk_size=CHUNK_SIZE) and are
+written out as they are read, so memory stays flat and the first bytes go
+out before the query finishes. Exports are CSV only: an XLSX file is a zip
+whose central directory is written last, so it can't be streamed row by
+row, and it would add openpyxl as a dependency. Spreadsheets open the CSV
+directly.
+"""
+import csv
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+
+from .models import Product, Sale, StockEntry
+
+CHUNK_SIZE = 2000
+
+# (header, lookup) pairs; computed columns are annotated below
+SALE_COLUMNS = [
+    ("Date Sold", "date_sold"),
+    ("Sale ID", "id"),
+    ("Product", "product__name"),
+    ("Category", "product__category__name"),
+    ("Vendor", "sold_by__username"),
+    ("Quantity", "quantity"),
+    ("Selling Price", "selling_price"),
+    ("Cost Price At Sale", "cost_price_at_sale"),
+    ("Total Sale Value", "total_sale_value"),
+    ("Total Profit", "total_profit"),
+    ("Payment Status", "payment_status"),
+]
+
+STOCK_ENTRY_COLUMNS = [
+    ("Date Added", "date_added"),
+    ("Entry ID", "id"),
+    ("Product", "product__name"),
+    ("Category", "product__category__name"),
+    ("Quantity", "quantity"),
+    ("Buying Price", "buying_price"),
+    ("Selling Price", "selling_price"),
+    ("Added By", "added_by__username"),
+]
+
+
+PURCHASE_ORDER_COLUMNS = [
+    ("Product ID", "id"),
+    ("Product", "name"),
+    ("Category", "category__full_name"),
+    ("In Stock", "quantity"),
+    ("Reorder Level", "reorder_level"),
+    ("Order Quantity", "shortfall"),
+    ("Unit Cost", "buying_price"),
+    ("Line Cost", "line_cost"),
+    ("Low Since", "went_low_at"),
+]
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _format(value):
+    if hasattr(value, "tzinfo"):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def sale_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Sale export rows as plain tuples, streamed from the database cursor."""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    queryset = queryset.annotate(
+        total_sale_value=ExpressionWrapper(F("quantity") * F("selling_price"), output_field=money),
+        total_profit=ExpressionWrapper(
+            (F("selling_price") - F("cost_price_at_sale")) * F("quantity"), output_field=money
+        ),
+    )
+    return (
+        queryset.order_by("date_sold", "id")
+        .values_list(*[lookup for _, lookup in SALE_COLUMNS])
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def stock_entry_rows(queryset, chunk_size=CHUNK_SIZE):
+    """StockEntry export rows as plain tuples, streamed from the database cursor."""
+    return (
+        queryset.order_by("date_added", "id")
+        .values_list(*[lookup for _, lookup in STOCK_ENTRY_COLUMNS])
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def purchase_order_rows(queryset, chunk_size=CHUNK_SIZE):
+    """One line per flagged product, read through the restock queue index."""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return (
+        queryset.filter(below_reorder=True)
+        .annotate(line_cost=ExpressionWrapper(F("shortfall") * F("buying_price"), output_field=money))
+        .order_by("went_low_at", "id")
+        .values_list(*[lookup for _, lookup in PURCHASE_ORDER_COLUMNS])
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def csv_lines(columns, rows):
+    """
+    Yield CSV-encoded lines: the header first, then one line per row.
+
+    The header is produced before the query runs, so a streaming response
+    sends its first byte immediately and holds at most one chunk in memory.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow([_format(value) for value in row])
+
+
+def export_sales_csv(queryset=None, chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = Sale.objects.all()
+    return csv_lines(SALE_COLUMNS, sale_rows(queryset, chunk_size))
+
+
+def export_stock_entries_csv(queryset=None, chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = StockEntry.objects.all()
+    return csv_lines(STOCK_ENTRY_COLUMNS, stock_entry_rows(queryset, chunk_size))
+
+
+def export_purchase_order_csv(queryset=None, chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = Product.objects.all()
+    return csv_lines(PURCHASE_ORDER_COLUMNS, purchase_order_rows(queryset, chunk_size))
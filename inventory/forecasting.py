@@ -0,0 +1,117 @@
+"""
+Demand forecasting for the whole catalog at once.
+
+Daily units sold per product are read from the sales rollup in a single
+values_list pass and laid out as a (products x days) NumPy matrix. Every
+statistic is then a whole-matrix operation: there is no per-product Python
+loop, so 50k products cost a handful of array passes.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailySalesSummary, Product, ProductForecast
+
+HISTORY_DAYS = 56      # days of sales history read
+WINDOW_DAYS = 28       # moving-average window (the most recent days)
+ALPHA = 0.2            # exponential smoothing factor; higher reacts faster
+LEAD_TIME_DAYS = 7     # supplier lead time
+COVER_DAYS = 14        # stock to hold beyond the lead time
+BATCH_SIZE = 2000
+
+
+def demand_matrix(product_ids, first_day, days):
+    """Units sold per product (rows, sorted by id) and day (columns, oldest first)."""
+    matrix = np.zeros((len(product_ids), days))
+    rows = DailySalesSummary.objects.filter(
+        day__gte=first_day, day__lt=first_day + timedelta(days=days),
+    ).values_list("product_id", "day", "units")
+
+    sold = list(rows)
+    if not sold:
+        return matrix
+
+    sale_products, sale_days, units = (np.array(column) for column in zip(*sold))
+    row_index = np.searchsorted(product_ids, sale_products)
+    # searchsorted gives where an id would go, not whether it's there: drop
+    # rows for products outside `product_ids` (e.g. created after it was read)
+    found = row_index < len(product_ids)
+    found[found] = product_ids[row_index[found]] == sale_products[found]
+
+    column_index = np.array([day.toordinal() for day in sale_days]) - first_day.toordinal()
+    # Several rollup rows (vendors, payment statuses) can share a cell
+    np.add.at(matrix, (row_index[found], column_index[found]), units[found].astype(float))
+    return matrix
+
+
+def forecast_catalog(
+    today=None, history_days=HISTORY_DAYS, window_days=WINDOW_DAYS, alpha=ALPHA,
+    lead_time_days=LEAD_TIME_DAYS, cover_days=COVER_DAYS,
+):
+    """
+    Forecast every product. Returns a dict of equally long arrays:
+    product_id, quantity, moving_average, smoothed_velocity, days_of_cover
+    (NaN where there is no recent demand) and reorder_quantity.
+    """
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=history_days - 1)
+
+    # One transaction, so on SQLite the rollup is read from the catalog's snapshot
+    with transaction.atomic():
+        catalog = Product.objects.order_by("pk").values_list("pk", "quantity")
+        catalog = np.array(list(catalog), dtype=np.int64).reshape(-1, 2)
+        product_ids, quantity = catalog[:, 0], catalog[:, 1]
+
+        demand = demand_matrix(product_ids, first_day, history_days)
+
+    moving_average = demand[:, -window_days:].mean(axis=1)
+
+    # Exponentially weighted mean, newest day weighted highest
+    weights = (1 - alpha) ** np.arange(history_days)
+    smoothed = demand[:, ::-1] @ (weights / weights.sum())
+
+    days_of_cover = np.divide(
+        quantity, smoothed, out=np.full(len(product_ids), np.nan), where=smoothed > 0,
+    )
+    target = np.ceil(smoothed * (lead_time_days + cover_days))
+    reorder_quantity = np.clip(target - quantity, 0, None).astype(np.int64)
+
+    return {
+        "product_id": product_ids,
+        "quantity": quantity,
+        "moving_average": moving_average,
+        "smoothed_velocity": smoothed,
+        "days_of_cover": days_of_cover,
+        "reorder_quantity": reorder_quantity,
+    }
+
+
+@transaction.atomic
+def save_forecasts(forecast, batch_size=BATCH_SIZE):
+    """Replace the ProductForecast table with `forecast`. Returns the row count."""
+    computed_at = timezone.now()
+    ProductForecast.objects.all().delete()
+
+    columns = zip(
+        forecast["product_id"].tolist(),
+        forecast["moving_average"].round(4).tolist(),
+        forecast["smoothed_velocity"].round(4).tolist(),
+        np.where(np.isnan(forecast["days_of_cover"]), None, forecast["days_of_cover"].round(2)).tolist(),
+        forecast["reorder_quantity"].tolist(),
+    )
+    rows = [
+        ProductForecast(
+            product_id=product_id,
+            moving_average=moving_average,
+            smoothed_velocity=smoothed_velocity,
+            days_of_cover=days_of_cover,
+            reorder_quantity=reorder_quantity,
+            computed_at=computed_at,
+        )
+        for product_id, moving_average, smoothed_velocity, days_of_cover, reorder_quantity in columns
+    ]
+    ProductForecast.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
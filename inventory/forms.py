@@ -1,16 +1,81 @@
 from django import forms
-from .models import Product, StockEntry, Sale
+from django.urls import reverse
+
+from .models import Category, Product, StockEntry, Sale
+from .reporting import DIMENSIONS, TIME_DIMENSIONS
+
+from core.utils import local_day_range
+from users.models import User
+
+class ProductSearchInput(forms.Widget):
+    """
+    Search box for picking a product (static/js/product_search.js, against
+    inventory:product_search) that submits the chosen product's id in a
+    hidden input. It renders no options, so the page stays the same size
+    however many products there are, and the field only looks up the
+    submitted id.
+    """
+    template_name = "widgets/product_search.html"
+
+    # {id: name} from a lookup the form already made, saving the widget its own
+    known_names = {}
+
+    class Media:
+        js = ["js/product_search.js"]
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        value = context["widget"]["value"]
+        # Show the current choice's name when the form is re-rendered
+        if not (value and str(value).isdigit()):
+            label = ""
+        elif int(value) in self.known_names:
+            label = self.known_names[int(value)]
+        else:
+            label = Product.objects.filter(pk=value).values_list("name", flat=True).first()
+        context["widget"]["label"] = label
+        context["widget"]["search_url"] = reverse("inventory:product_search")
+        return context
+
 
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
         fields = ["name", "category", "reorder_level"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Category labels include the parent name
+        self.fields["category"].queryset = Category.objects.order_by("full_name")
+
+
+class ProductIdField(forms.ModelChoiceField):
+    """
+    Product choice that doesn't load the product: the submitted id becomes
+    an unsaved Product(pk=id), the model's ForeignKey check confirms the row
+    exists, and the write path reads the product itself. Only for forms
+    whose save re-reads the product (StockEntry._receive locks it anyway).
+    """
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return Product(pk=int(value))
+        except (TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages["invalid_choice"], code="invalid_choice")
+
 
 class StockEntryForm(forms.ModelForm):
     class Meta:
         model = StockEntry
         fields = ["product", "quantity", "buying_price", "selling_price"]
+        field_classes = {
+            "product": ProductIdField,
+        }
+        widgets = {
+            "product": ProductSearchInput(),
+        }
 
 
 class SaleForm(forms.ModelForm):
@@ -18,7 +83,7 @@ class SaleForm(forms.ModelForm):
         model = Sale
         fields = ["product", "quantity", "selling_price"]
         widgets = {
-            "product": forms.Select(attrs={"class": "form-select"}),
+            "product": ProductSearchInput(),
             "quantity": forms.NumberInput(attrs={
                 "class": "form-control",
                 "min": 1,
@@ -31,3 +96,169 @@ class SaleForm(forms.ModelForm):
                 "placeholder": "Enter selling price",
             }),
         }
+
+
+class StockIntakeForm(forms.Form):
+    csv_file = forms.FileField(
+        label="Delivery CSV",
+        help_text="Columns: product (id or name), quantity, buying_price, selling_price",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv"}),
+    )
+    dry_run = forms.BooleanField(
+        required=False, initial=True,
+        label="Dry run (preview changes without saving)",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+
+class BasketLineForm(forms.Form):
+    """One basket line; BaseBasketFormSet checks the product ids for the whole basket at once."""
+    product = forms.IntegerField(widget=ProductSearchInput())
+    quantity = forms.IntegerField(
+        min_value=1,
+        widget=forms.NumberInput(attrs={"class": "form-control", "min": 1, "placeholder": "Qty"}),
+    )
+    selling_price = forms.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0,
+        widget=forms.NumberInput(attrs={"class": "form-control", "min": 0, "step": "0.01", "placeholder": "Price"}),
+    )
+
+
+class BaseBasketFormSet(forms.BaseFormSet):
+    def clean(self):
+        # One primary key lookup for every line, instead of a query per line
+        lines = [form for form in self.forms if form.cleaned_data.get("product") is not None]
+        names = dict(
+            Product.objects.filter(pk__in={form.cleaned_data["product"] for form in lines})
+            .values_list("pk", "name")
+        )
+        for form in lines:
+            # Re-rendered lines show their product's name without looking it up again
+            form.fields["product"].widget.known_names = names
+            if form.cleaned_data["product"] not in names:
+                form.add_error("product", "Select a valid product.")
+
+
+BasketFormSet = forms.formset_factory(
+    BasketLineForm, formset=BaseBasketFormSet, extra=3, min_num=1, validate_min=True,
+)
+
+
+class CheckoutForm(forms.Form):
+    payment_status = forms.ChoiceField(
+        choices=Sale.PAYMENT_CHOICES,
+        initial="Paid",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+
+class SaleSyncLineForm(forms.Form):
+    """One queued sale in a POS sync batch (validated from JSON, not rendered)."""
+    key = forms.CharField(max_length=64)
+    product = forms.IntegerField()
+    quantity = forms.IntegerField(min_value=1)
+    selling_price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    payment_status = forms.ChoiceField(choices=Sale.PAYMENT_CHOICES, required=False)
+
+    def clean_payment_status(self):
+        return self.cleaned_data["payment_status"] or "Paid"
+
+
+class DateRangeFilterForm(forms.Form):
+    """Base for list filters; subclasses set `date_field` and extend filter_queryset."""
+    date_field = None
+
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.order_by("full_name"),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+
+    def filter_queryset(self, queryset):
+        """Apply the cleaned filters to `queryset`; unbound/invalid forms filter nothing."""
+        if not self.is_valid():
+            return queryset
+
+        # Plain datetime ranges keep the date index usable (no __date lookups)
+        start, end = local_day_range(self.cleaned_data["date_from"], self.cleaned_data["date_to"])
+        if start:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": start})
+        if end:
+            queryset = queryset.filter(**{f"{self.date_field}__lt": end})
+        if self.cleaned_data.get("category"):
+            # The chosen category and everything below it
+            subtree = self.cleaned_data["category"].descendants().values("pk")
+            queryset = queryset.filter(product__category__in=subtree)
+        return queryset
+
+
+class SaleFilterForm(DateRangeFilterForm):
+    date_field = "date_sold"
+
+    vendor = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_staff=False).select_related("role").order_by("username"),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    payment_status = forms.ChoiceField(
+        choices=[("", "All payments")] + Sale.PAYMENT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.is_valid():
+            return queryset
+
+        if self.cleaned_data.get("vendor"):
+            queryset = queryset.filter(sold_by=self.cleaned_data["vendor"])
+        if self.cleaned_data.get("payment_status"):
+            queryset = queryset.filter(payment_status=self.cleaned_data["payment_status"])
+        return queryset
+
+
+class StockEntryFilterForm(DateRangeFilterForm):
+    date_field = "date_added"
+
+
+class SalesPivotForm(SaleFilterForm):
+    """The sales filters plus the report's dimensions, applied to the DailySalesSummary rollup."""
+    dimensions = forms.MultipleChoiceField(
+        choices=[(name, label) for name, (label, _) in DIMENSIONS.items()],
+        required=False,
+        widget=forms.SelectMultiple(attrs={"class": "form-select form-select-sm", "size": 3}),
+        help_text="Group by, outermost first",
+    )
+
+    def clean_dimensions(self):
+        dimensions = self.cleaned_data["dimensions"]
+        if len([d for d in dimensions if d in TIME_DIMENSIONS]) > 1:
+            raise forms.ValidationError("Pick one of day, week or month.")
+        return dimensions
+
+    def filter_queryset(self, queryset):
+        if not self.is_valid():
+            return queryset
+
+        data = self.cleaned_data
+        if data["date_from"]:
+            queryset = queryset.filter(day__gte=data["date_from"])
+        if data["date_to"]:
+            queryset = queryset.filter(day__lte=data["date_to"])
+        if data.get("category"):
+            # The rollup's own category, like the "category" dimension
+            queryset = queryset.filter(**data["category"].subtree_lookup("category"))
+        if data.get("vendor"):
+            queryset = queryset.filter(vendor=data["vendor"])
+        if data.get("payment_status"):
+            queryset = queryset.filter(payment_status=data["payment_status"])
+        return queryset
@@ -0,0 +1,148 @@
+import csv
+import io
+
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import invalidate
+from .models import CENTS, CatalogVersion, Product, StockEntry, StockMovement
+
+REQUIRED_COLUMNS = ("product", "quantity", "buying_price", "selling_price")
+
+
+def parse_intake_csv(file):
+    """
+    Parse a supplier delivery CSV with columns product (id or exact name),
+    quantity, buying_price and selling_price. Returns a list of line dicts;
+    raises ValidationError listing every bad line.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig")
+
+    reader = csv.DictReader(file)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValidationError(f"Missing column(s): {', '.join(missing)}")
+
+    lines, errors = [], []
+    for number, row in enumerate(reader, start=2):  # line 1 is the header
+        try:
+            quantity = int(row["quantity"])
+            buying_price = Decimal(row["buying_price"])
+            selling_price = Decimal(row["selling_price"])
+        except (TypeError, ValueError, InvalidOperation):
+            errors.append(f"Line {number}: quantity and prices must be numbers.")
+            continue
+        if quantity < 1 or buying_price < 0 or selling_price < 0:
+            errors.append(f"Line {number}: quantity must be positive and prices not negative.")
+            continue
+
+        lines.append({
+            "line": number,
+            "product": (row["product"] or "").strip(),
+            "quantity": quantity,
+            "buying_price": buying_price,
+            "selling_price": selling_price,
+        })
+
+    if errors:
+        raise ValidationError(errors)
+    return lines
+
+
+def _resolve_products(lines, lock):
+    """Map each line's product reference (id or name) to a Product with one query."""
+    refs = {line["product"] for line in lines}
+    ids = {int(ref) for ref in refs if ref.isdigit()}
+    names = refs - {str(pk) for pk in ids}
+
+    queryset = Product.objects.filter(pk__in=ids) | Product.objects.filter(name__in=names)
+    if lock:
+        queryset = queryset.select_for_update()
+
+    by_ref = {}
+    for product in queryset.order_by("pk"):
+        by_ref[str(product.pk)] = product
+        if product.name in names:
+            by_ref.setdefault(product.name, product)
+
+    missing = [f"Line {line['line']}: unknown product '{line['product']}'."
+               for line in lines if line["product"] not in by_ref]
+    if missing:
+        raise ValidationError(missing)
+    return by_ref
+
+
+@transaction.atomic
+def bulk_intake(lines, added_by=None, dry_run=False):
+    """
+    Receive a whole delivery in one transaction.
+
+    Lines are grouped per product and the weighted-average prices are folded
+    over each group in memory with StockEntry.weighted_prices, exactly as if
+    the entries had been saved one by one. Then all entries go in with one
+    bulk_create and all products with one bulk_update.
+
+    Returns a per-product report of the before/after state. With dry_run
+    nothing is written.
+    """
+    version = None if dry_run else CatalogVersion.bump()
+    by_ref = _resolve_products(lines, lock=not dry_run)
+
+    report = {}
+    entries, movements = [], []
+    for line in lines:
+        product = by_ref[line["product"]]
+        row = report.setdefault(product.pk, {
+            "product": product,
+            "lines": 0,
+            "quantity_before": product.quantity,
+            "buying_price_before": product.buying_price,
+            "selling_price_before": product.selling_price,
+        })
+        row["lines"] += 1
+
+        total_qty, avg_cost, avg_sell = StockEntry.weighted_prices(
+            product.quantity, product.buying_price, product.selling_price,
+            line["quantity"], line["buying_price"], line["selling_price"],
+        )
+        # Match what the database stores between single saves
+        product.quantity = total_qty
+        product.buying_price = avg_cost
+        product.selling_price = avg_sell.quantize(CENTS)
+        product.refresh_restock_state()
+
+        entry = StockEntry(
+            product=product,
+            quantity=line["quantity"],
+            buying_price=line["buying_price"],
+            selling_price=line["selling_price"],
+            added_by=added_by,
+        )
+        entries.append(entry)
+        movements.append(StockMovement.build(
+            product, StockMovement.INTAKE, entry.quantity, entry.buying_price, stock_entry=entry,
+        ))
+
+    for row in report.values():
+        product = row["product"]
+        row["quantity_after"] = product.quantity
+        row["buying_price_after"] = product.buying_price
+        row["selling_price_after"] = product.selling_price
+
+    if not dry_run:
+        StockEntry.objects.bulk_create(entries)
+        products = [row["product"] for row in report.values()]
+        CatalogVersion.stamp(products, version)
+        Product.objects.bulk_update(
+            products,
+            ["quantity", "buying_price", "selling_price", "catalog_version", *Product.RESTOCK_FIELDS],
+        )
+        StockMovement.objects.bulk_create(movements)
+        invalidate("stock", "catalog")  # bulk writes send no post_save signals
+
+    return list(report.values())
@@ -0,0 +1,64 @@
+"""
+Point-in-time stock reads over the StockMovement ledger.
+
+Every movement carries the product's running balance, so the state at any
+moment is the last movement before it. Reading that for the whole catalog
+starts from the latest StockCheckpoint at or before the moment and replays
+only the movements since, a scan bounded by the checkpoint period rather
+than by the length of the history.
+
+Moments are exclusive: the stock "as of" midnight is everything moved
+before it, which makes day and month boundaries line up.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import StockCheckpoint, StockMovement
+
+CHUNK_SIZE = 2000
+
+
+def stock_at(when, products=None):
+    """
+    {product_id: (quantity, average_cost)} from everything moved before
+    `when`. Products with no movement by then are absent; `products`
+    optionally limits the read.
+    """
+    checkpoints = StockCheckpoint.objects.filter(as_of__lte=when)
+    movements = StockMovement.objects.filter(occurred_at__lt=when)
+    if products is not None:
+        checkpoints = checkpoints.filter(product__in=products)
+        movements = movements.filter(product__in=products)
+
+    state = {}
+    as_of = checkpoints.aggregate(latest=Max("as_of"))["latest"]
+    if as_of:
+        for product_id, quantity, average_cost in (
+            checkpoints.filter(as_of=as_of).values_list("product_id", "quantity", "average_cost")
+        ):
+            state[product_id] = (quantity, average_cost)
+        movements = movements.filter(occurred_at__gte=as_of)
+
+    # Later movements overwrite earlier ones: the last one holds the balance
+    for product_id, quantity, average_cost in (
+        movements.order_by("occurred_at", "id")
+        .values_list("product_id", "balance_quantity", "average_cost")
+        .iterator(chunk_size=CHUNK_SIZE)
+    ):
+        state[product_id] = (quantity, average_cost)
+    return state
+
+
+@transaction.atomic
+def write_checkpoint(as_of, batch_size=CHUNK_SIZE):
+    """Snapshot every product's state just before `as_of`, replacing any snapshot at that moment."""
+    state = stock_at(as_of)
+    StockCheckpoint.objects.filter(as_of=as_of).delete()
+    StockCheckpoint.objects.bulk_create(
+        [
+            StockCheckpoint(product_id=product_id, as_of=as_of, quantity=quantity, average_cost=cost)
+            for product_id, (quantity, cost) in state.items()
+        ],
+        batch_size=batch_size,
+    )
+    return len(state)
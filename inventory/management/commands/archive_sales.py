@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.utils import local_day_range
+from inventory.archive import CHUNK_SIZE, archive_before
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves Sale and StockEntry rows from closed months into the archive tables in "
+        "resumable chunks; rollups and the stock ledger are untouched (run e.g. monthly from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, help="First month to keep live, YYYY-MM")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows moved per transaction")
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.strptime(options["before"], "%Y-%m").date()
+        except ValueError:
+            raise CommandError(f"Invalid month '{options['before']}', use YYYY-MM")
+
+        today = timezone.localdate()
+        if month > date(today.year, today.month, 1):
+            raise CommandError("Only closed months can be archived: --before can be this month at the latest")
+
+        before, _ = local_day_range(month)
+        moved = archive_before(
+            before, options["chunk_size"],
+            progress=lambda model, count: self.stderr.write(f"{model._meta.verbose_name_plural}: {count}"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Archived {sum(moved.values())} rows dated before {before:%Y-%m-%d}: "
+            + ", ".join(f"{count} {model._meta.verbose_name_plural.lower()}" for model, count in moved.items())
+        ))
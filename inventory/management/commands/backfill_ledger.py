@@ -0,0 +1,133 @@
+import heapq
+
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import (
+    ArchivedSale, ArchivedStockEntry, Product, Sale, StockCheckpoint, StockEntry, StockMovement,
+)
+
+CENTS = Decimal("0.01")
+
+
+def month_after(moment):
+    """Local midnight on the first day of the month after `moment`."""
+    day = timezone.localtime(moment).date()
+    first = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return timezone.make_aware(datetime.combine(first, time.min))
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the stock movement ledger from the stock entry and sale history, archived "
+        "months included, with a checkpoint at every month start, and reconciles it with "
+        "current product quantities"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=2000,
+            help="Number of ledger rows written per insert",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        deleted, _ = StockMovement.objects.all().delete()
+        StockCheckpoint.objects.all().delete()
+        self.stdout.write(self.style.WARNING(f"⚠️ Removed {deleted} existing ledger rows"))
+
+        # Both histories, live and archived, in time order; intakes first on
+        # equal timestamps. Archived rows are replayed like live ones but not
+        # linked: their source rows are gone, as after archive_sales itself.
+        streams = [
+            self.entries(StockEntry, live=True), self.entries(ArchivedStockEntry, live=False),
+            self.sales(Sale, live=True), self.sales(ArchivedSale, live=False),
+        ]
+
+        state = {}  # product_id -> [quantity, average cost, average selling price]
+        movements, checkpoints = [], 0
+        next_checkpoint = None
+        written = 0
+
+        for when, source, pk, product_id, quantity, cost, sell, live in heapq.merge(*streams):
+            # Crossing a month start: snapshot everything moved before it
+            if next_checkpoint is None:
+                next_checkpoint = month_after(when)
+            while when >= next_checkpoint:
+                StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+                written += len(movements)
+                movements = []
+                StockCheckpoint.objects.bulk_create([
+                    StockCheckpoint(product_id=p, as_of=next_checkpoint, quantity=q, average_cost=c)
+                    for p, (q, c, _) in state.items()
+                ], batch_size=batch_size)
+                checkpoints += 1
+                next_checkpoint = month_after(next_checkpoint)
+
+            current = state.setdefault(product_id, [0, cost, sell or cost])
+            if source == 0:
+                total_qty, avg_cost, avg_sell = StockEntry.weighted_prices(
+                    current[0], current[1], current[2], quantity, cost, sell,
+                )
+                current[:] = [total_qty, avg_cost, avg_sell.quantize(CENTS)]
+                movements.append(StockMovement(
+                    product_id=product_id, kind=StockMovement.INTAKE, quantity_delta=quantity,
+                    unit_cost=cost, balance_quantity=total_qty, average_cost=avg_cost,
+                    occurred_at=when, stock_entry_id=pk if live else None,
+                ))
+            else:
+                current[0] -= quantity
+                movements.append(StockMovement(
+                    product_id=product_id, kind=StockMovement.SALE, quantity_delta=-quantity,
+                    unit_cost=cost, balance_quantity=current[0], average_cost=current[1],
+                    occurred_at=when, sale_id=pk if live else None,
+                ))
+
+            if len(movements) >= batch_size:
+                StockMovement.objects.bulk_create(movements)
+                written += len(movements)
+                movements = []
+
+        # Anything the history doesn't explain (edits, stock set by hand)
+        now = timezone.now()
+        adjustments = 0
+        for product_id, quantity, cost in Product.objects.values_list("pk", "quantity", "buying_price").iterator():
+            replayed = state[product_id][0] if product_id in state else 0
+            if replayed != quantity:
+                movements.append(StockMovement(
+                    product_id=product_id, kind=StockMovement.ADJUSTMENT, quantity_delta=quantity - replayed,
+                    unit_cost=cost, balance_quantity=quantity, average_cost=cost, occurred_at=now,
+                ))
+                adjustments += 1
+
+        StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+        written += len(movements)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Wrote {written} ledger rows ({adjustments} reconciling adjustments) "
+            f"and {checkpoints} monthly checkpoints"
+        ))
+
+    @staticmethod
+    def entries(model, live):
+        for when, pk, product_id, quantity, cost, sell in (
+            model.objects.order_by("date_added", "id")
+            .values_list("date_added", "id", "product_id", "quantity", "buying_price", "selling_price")
+            .iterator()
+        ):
+            yield when, 0, pk, product_id, quantity, cost, sell, live
+
+    @staticmethod
+    def sales(model, live):
+        for when, pk, product_id, quantity, cost in (
+            model.objects.order_by("date_sold", "id")
+            .values_list("date_sold", "id", "product_id", "quantity", "cost_price_at_sale")
+            .iterator()
+        ):
+            yield when, 1, pk, product_id, quantity, cost, None, live
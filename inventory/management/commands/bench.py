@@ -0,0 +1,253 @@
+import io
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import throwaway_database
+from inventory.models import Category, Product, Sale, StockEntry
+from users.models import Role, User
+
+BATCH_SIZE = 5000
+
+# (label, role, url name, query params)
+SCENARIOS = [
+    ("admin_dashboard", "admin", "inventory:admin_dashboard", None),
+    ("stock_list", "admin", "inventory:stock", None),
+    ("sales_report", "admin", "inventory:sales_report", None),
+    ("sales_report_filtered", "admin", "inventory:sales_report", {"payment_status": "Credit"}),
+    ("vendor_dashboard", "vendor", "inventory:vendor_dashboard", None),
+    ("vendor_sales", "vendor", "inventory:vendor_sales", None),
+]
+
+
+def parse_scale(value):
+    """'1k' -> 1000, '1M' -> 1000000."""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    value = value.strip().lower()
+    try:
+        if value[-1] in multipliers:
+            return int(float(value[:-1]) * multipliers[value[-1]])
+        return int(value)
+    except (ValueError, IndexError):
+        raise CommandError(f"Invalid scale '{value}', use e.g. 1000, 100k or 1M")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk seeding set auto_now_add fields (e.g. backdated sales)."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the inventory views on a throwaway database seeded at the given scale "
+        "and reports p50/p95 latency (warm and cold cache), query count and peak memory as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sales", default="1k", help="Number of sales to seed: 1000, 100k, 1M...")
+        parser.add_argument("--products", type=int, help="Catalog size (default: sales / 100, at least 50)")
+        parser.add_argument("--vendors", type=int, default=10)
+        parser.add_argument("--days", type=int, default=365, help="Spread sales over this many days")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per view")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+        parser.add_argument("--baseline", help="Compare against a previous report")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Allowed p95 slowdown against the baseline (0.2 = 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        sales = parse_scale(options["sales"])
+        products = options["products"] or max(50, sales // 100)
+
+        with throwaway_database():
+            started = time.perf_counter()
+            admin, vendor = self.seed(sales, products, options)
+            seed_seconds = time.perf_counter() - started
+            self.stderr.write(f"Seeded {sales} sales / {products} products in {seed_seconds:.1f}s")
+
+            report = {
+                "scale": {"sales": sales, "products": products, "vendors": options["vendors"]},
+                "repeat": options["repeat"],
+                "results": self.run_scenarios({"admin": admin, "vendor": vendor}, options["repeat"]),
+            }
+
+        regressions = []
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            regressions = self.compare(report, baseline, options["tolerance"])
+            report["regressions"] = regressions
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+
+    def seed(self, sales, products, options):
+        rnd = random.Random(options["seed"])
+        now = timezone.now()
+
+        admin_role = Role.objects.create(name="admin", display_name="Admin")
+        vendor_role = Role.objects.create(name="vendor", display_name="Vendor")
+        admin = User.objects.create_user("bench-admin", "bench-admin@example.com", None, role=admin_role, is_staff=True)
+        vendors = User.objects.bulk_create([
+            User(username=f"bench-vendor-{i}", email=f"bench-vendor-{i}@example.com", role=vendor_role)
+            for i in range(options["vendors"])
+        ])
+
+        # One by one: Category.save fills in path and full_name, which the
+        # subtree rollups range-scan on
+        roots = [Category.objects.create(name=f"Category {i}") for i in range(5)]
+        categories = roots + [
+            Category.objects.create(name=f"Subcategory {i}", parent=roots[i % len(roots)]) for i in range(10)
+        ]
+
+        catalog = []
+        for i in range(products):
+            cost = Decimal(rnd.randint(10, 200) * 10)
+            product = Product(
+                name=f"Product {i:06d}",
+                category=rnd.choice(categories),
+                buying_price=cost,
+                selling_price=cost * Decimal("1.5"),
+                quantity=rnd.randint(0, 500),
+                reorder_level=5,
+            )
+            product.refresh_restock_state()
+            catalog.append(product)
+        catalog = Product.objects.bulk_create(catalog, batch_size=BATCH_SIZE)
+
+        date_added = StockEntry._meta.get_field("date_added")
+        date_sold = Sale._meta.get_field("date_sold")
+        with explicit_timestamps(date_added, date_sold):
+            StockEntry.objects.bulk_create([
+                StockEntry(
+                    product=product, quantity=rnd.randint(10, 200),
+                    buying_price=product.buying_price, selling_price=product.selling_price,
+                    added_by=admin, date_added=now - timedelta(days=rnd.randint(0, options["days"])),
+                )
+                for product in catalog
+                for _ in range(3)
+            ], batch_size=BATCH_SIZE)
+
+            batch = []
+            for _ in range(sales):
+                product = rnd.choice(catalog)
+                batch.append(Sale(
+                    product=product,
+                    quantity=rnd.randint(1, 5),
+                    selling_price=product.selling_price,
+                    cost_price_at_sale=product.buying_price,
+                    sold_by=rnd.choice(vendors),
+                    payment_status=rnd.choice(["Paid", "Paid", "Paid", "Credit"]),
+                    date_sold=now - timedelta(seconds=rnd.randint(0, options["days"] * 86400)),
+                ))
+                if len(batch) >= BATCH_SIZE:
+                    Sale.objects.bulk_create(batch)
+                    batch = []
+            Sale.objects.bulk_create(batch)
+
+        call_command("rebuild_sales_summary", stdout=io.StringIO())
+        return admin, vendors[0]
+
+    def run_scenarios(self, users, repeat):
+        results = {}
+        for label, role, url_name, params in SCENARIOS:
+            client = Client()
+            client.force_login(users[role])
+            url = reverse(url_name)
+
+            client.get(url, params)  # warm up template loading
+
+            # Cold: every request recomputes its cached blocks, as after a write
+            cold_timings, cold_queries, _ = self.time_requests(client, url, params, repeat, clear_cache=True)
+            client.get(url, params)  # warm up caches
+            timings, queries, response = self.time_requests(client, url, params, repeat)
+            if response.status_code != 200:
+                raise CommandError(f"{label}: HTTP {response.status_code}")
+
+            tracemalloc.start()
+            client.get(url, params)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[f"{role}:{label}"] = {
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(percentile(timings, 95), 2),
+                "queries": queries,
+                "peak_kb": round(peak / 1024, 1),
+                "cold_p50_ms": round(statistics.median(cold_timings), 2),
+                "cold_p95_ms": round(percentile(cold_timings, 95), 2),
+                "cold_queries": cold_queries,
+            }
+            self.stderr.write(f"{role}:{label}: {results[f'{role}:{label}']}")
+        return results
+
+    def time_requests(self, client, url, params, repeat, clear_cache=False):
+        """Milliseconds per request, the most queries any of them ran, and the last response."""
+        timings, queries = [], 0
+        for _ in range(repeat):
+            if clear_cache:
+                cache.clear()
+            # Per request: request_started resets the connection's query log
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(ctx.captured_queries))
+        return timings, queries, response
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for key, current in report["results"].items():
+            previous = baseline.get("results", {}).get(key)
+            if previous is None:
+                continue
+            for prefix, label in [("", ""), ("cold_", "cold ")]:
+                if f"{prefix}p95_ms" not in previous:
+                    continue  # a baseline from before cold timings were reported
+                if current[f"{prefix}p95_ms"] > previous[f"{prefix}p95_ms"] * (1 + tolerance):
+                    regressions.append(
+                        f"{key}: {label}p95 {previous[f'{prefix}p95_ms']}ms -> {current[f'{prefix}p95_ms']}ms"
+                    )
+                if current[f"{prefix}queries"] > previous[f"{prefix}queries"]:
+                    regressions.append(
+                        f"{key}: {label}queries {previous[f'{prefix}queries']} -> {current[f'{prefix}queries']}"
+                    )
+            if current["peak_kb"] > previous["peak_kb"] * (1 + tolerance):
+                regressions.append(f"{key}: peak memory {previous['peak_kb']}KB -> {current['peak_kb']}KB")
+        return regressions
@@ -0,0 +1,206 @@
+import asyncio
+import io
+import json
+import statistics
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.testing import throwaway_database
+from inventory.management.commands.bench import Command as Bench, parse_scale, percentile
+
+HOST = "testserver"
+
+# (label, role, url name)
+SCENARIOS = [
+    ("admin_dashboard", "admin", "inventory:admin_dashboard"),
+    ("vendor_dashboard", "vendor", "inventory:vendor_dashboard"),
+]
+
+
+def wsgi_get(application, path, cookie):
+    """One GET straight through the WSGI handler, as a WSGI server would make it."""
+    status = []
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": HOST,
+        "HTTP_COOKIE": cookie,
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    response = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()  # fires request_finished, as servers do
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, path, cookie):
+    """One GET straight through the ASGI handler, as an ASGI server would make it."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", HOST.encode()), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": (HOST, 80),
+    }
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Future()  # the client never disconnects; Django cancels this
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def summarize(timings, elapsed):
+    return {
+        "requests": len(timings),
+        "req_per_s": round(len(timings) / elapsed, 1),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the dashboards' latency and throughput through Django's WSGI and ASGI "
+        "handlers at several concurrency levels, on a throwaway database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sales", default="10k", help="Number of sales to seed: 1000, 100k, 1M...")
+        parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrent client counts")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+        parser.add_argument(
+            "--no-cache", action="store_true",
+            help="Run with a dummy cache so every request computes its aggregates",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        sales = parse_scale(options["sales"])
+        levels = [int(level) for level in options["concurrency"].split(",")]
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, HOST]}
+        if options["no_cache"]:
+            overrides["CACHES"] = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+        # File-backed so every thread's connection sees the seeded data
+        with throwaway_database(file_backed=True), override_settings(**overrides):
+            seed_options = {"seed": options["seed"], "vendors": 10, "days": 365}
+            admin, vendor = Bench().seed(sales, max(50, sales // 100), seed_options)
+            cookies = {}
+            for role, user in [("admin", admin), ("vendor", vendor)]:
+                client = Client()
+                client.force_login(user)
+                cookies[role] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+            connection.close()
+
+            wsgi, asgi = get_wsgi_application(), get_asgi_application()
+            results = {}
+            for label, role, url_name in SCENARIOS:
+                path = reverse(url_name)
+                for level in levels:
+                    # Warm up both stacks (middleware loading, templates, cache)
+                    self.check_status(label, wsgi_get(wsgi, path, cookies[role]))
+                    self.check_status(label, asyncio.run(asgi_get(asgi, path, cookies[role])))
+
+                    row = {
+                        "wsgi": self.run_wsgi(wsgi, path, cookies[role], level, options["requests"]),
+                        "asgi": asyncio.run(self.run_asgi(asgi, path, cookies[role], level, options["requests"])),
+                    }
+                    row["asgi_p95_vs_wsgi"] = round(row["asgi"]["p95_ms"] / row["wsgi"]["p95_ms"], 2)
+                    results[f"{label}@{level}"] = row
+                    self.stderr.write(f"{label}@{level}: {row}")
+            connection.close()
+
+        report = {
+            "scale": {"sales": sales},
+            "cache": not options["no_cache"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def check_status(self, label, status):
+        if status != 200:
+            raise CommandError(f"{label}: HTTP {status}")
+
+    def run_wsgi(self, application, path, cookie, level, requests):
+        """`level` threads, as a threaded WSGI server would run them."""
+        timings, lock = [], threading.Lock()
+        barrier = threading.Barrier(level)
+
+        def client(count):
+            try:
+                barrier.wait()
+                for _ in range(count):
+                    started = time.perf_counter()
+                    self.check_status(path, wsgi_get(application, path, cookie))
+                    with lock:
+                        timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(requests // level,)) for _ in range(level)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(timings, time.perf_counter() - started)
+
+    async def run_asgi(self, application, path, cookie, level, requests):
+        """`level` concurrent clients on one event loop, as uvicorn would serve them."""
+        timings = []
+
+        async def client(count):
+            for _ in range(count):
+                started = time.perf_counter()
+                self.check_status(path, await asgi_get(application, path, cookie))
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client(requests // level) for _ in range(level)])
+        return summarize(timings, time.perf_counter() - started)
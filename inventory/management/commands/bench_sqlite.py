@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import time
+
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.db import PRODUCTION_SQLITE
+from core.testing import throwaway_database
+from inventory.management.commands.bench import percentile
+from inventory.management.commands.bench_asgi import HOST, summarize, wsgi_get
+from inventory.management.commands.stress_sales import Command as StressSales, Worker
+
+# (label, database settings layered over the default entry)
+PROFILES = [
+    ("default", {}),
+    ("production", PRODUCTION_SQLITE),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs concurrent sales and restocks alongside catalog reads through the WSGI handler, "
+        "once on SQLite's defaults and once on the production profile (core.db), and compares "
+        "throughput, latency and lock failures"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4, help="Processes selling and restocking")
+        parser.add_argument("--readers", type=int, default=4, help="Processes reading the catalog")
+        parser.add_argument("--ops", type=int, default=100, help="Operations per writer")
+        parser.add_argument("--products", type=int, default=50)
+        parser.add_argument("--initial-stock", type=int, default=1000)
+        parser.add_argument("--restock-ratio", type=float, default=0.2)
+        parser.add_argument("--retries", type=int, default=0, help="Retries on lock errors")
+        parser.add_argument("--backoff", type=float, default=0.01)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        options["threads"] = options["writers"]
+        results = {label: self.run_profile(profile, options) for label, profile in PROFILES}
+        for label, row in results.items():
+            self.stderr.write(f"{label}: {row}")
+
+        before, after = results["default"], results["production"]
+        report = {
+            "writers": options["writers"],
+            "readers": options["readers"],
+            "results": results,
+            "writes_per_s_ratio": round(after["writes"]["per_s"] / before["writes"]["per_s"], 2),
+            "reads_per_s_ratio": round(after["reads"]["req_per_s"] / before["reads"]["req_per_s"], 2),
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def run_profile(self, profile, options):
+        saved = dict(connection.settings_dict)
+        connection.settings_dict.update(profile)
+        try:
+            # File-backed: WAL and shared locking only exist on a real file
+            with throwaway_database(file_backed=True), \
+                    override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+                return self.measure(options)
+        finally:
+            connection.settings_dict.clear()
+            connection.settings_dict.update(saved)
+
+    def measure(self, options):
+        product_ids, vendor = StressSales().seed(options)
+        client = Client()
+        client.force_login(vendor)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        path = reverse("inventory:catalog")
+        connection.close()  # forked processes open their own
+
+        # Processes, as a pre-forking server runs workers, so the GIL doesn't
+        # decide who gets the database lock
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(options["writers"] + options["readers"])
+        writing = context.Event()
+        writing.set()
+        results = context.Queue()
+
+        writers = [
+            context.Process(target=run_writer, args=(i, product_ids, vendor, options, barrier, results))
+            for i in range(options["writers"])
+        ]
+        readers = [
+            context.Process(target=run_reader, args=(path, cookie, barrier, writing, results))
+            for _ in range(options["readers"])
+        ]
+        started = time.perf_counter()
+        for process in writers + readers:
+            process.start()
+        # Each process sends exactly one result; collect before joining so the queue can drain
+        collected = [results.get() for _ in writers]
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        collected += [results.get() for _ in readers]
+        for process in writers + readers:
+            process.join()
+
+        workers = [SimpleNamespace(**row) for kind, row in collected if kind == "writer"]
+        reads = [ms for kind, row in collected if kind == "reader" for ms in row["latencies"]]
+        read_failures = sum(row["failures"] for kind, row in collected if kind == "reader")
+
+        stress = StressSales().report(workers, elapsed, product_ids, options)
+        latencies = [ms for worker in workers for ms in worker.latencies]
+        writes = stress["sales"] + stress["restocks"]
+        return {
+            "writes": {
+                "ops": writes,
+                "per_s": round(writes / elapsed, 1),
+                "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+                "lock_failures": stress["failures"],
+                "retries": stress["retries"],
+                "consistent": stress["consistent"],
+                "sample_errors": stress["sample_errors"],
+            },
+            "reads": {**summarize(reads, elapsed), "failures": read_failures} if reads
+            else {"requests": 0, "req_per_s": 0, "failures": read_failures},
+        }
+
+
+def run_writer(index, product_ids, vendor, options, barrier, results):
+    worker = Worker(index, product_ids, vendor, options, barrier)
+    worker.run()  # in this process, not as a thread
+    results.put(("writer", {
+        name: getattr(worker, name)
+        for name in ["sales", "restocks", "rejected", "failures", "retries", "lock_wait", "latencies", "errors"]
+    }))
+
+
+def run_reader(path, cookie, barrier, writing, results):
+    application = get_wsgi_application()
+    latencies, failures = [], 0
+    barrier.wait()
+    while writing.is_set():
+        started = time.perf_counter()
+        try:
+            status = wsgi_get(application, path, cookie)
+        except Exception:  # "database is locked" can escape as an exception
+            status = None
+        if status == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            failures += 1
+    connection.close()
+    results.put(("reader", {"latencies": latencies, "failures": failures}))
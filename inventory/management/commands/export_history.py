@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.archive import with_archive
+from inventory.exports import CHUNK_SIZE, export_sales_csv, export_stock_entries_csv
+from inventory.forms import SaleFilterForm, StockEntryFilterForm
+from inventory.models import Sale, StockEntry
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Streams the Sale or StockEntry history to CSV (stdout or --output file)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["sales", "stock"])
+        parser.add_argument("--from", dest="date_from", help="First day, YYYY-MM-DD")
+        parser.add_argument("--to", dest="date_to", help="Last day (inclusive), YYYY-MM-DD")
+        parser.add_argument("--vendor", help="Vendor username (sales only)")
+        parser.add_argument("--category", type=int, help="Category id")
+        parser.add_argument("--payment-status", choices=[c for c, _ in Sale.PAYMENT_CHOICES])
+        parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        data = {
+            "date_from": options["date_from"],
+            "date_to": options["date_to"],
+            "category": options["category"],
+        }
+
+        if options["kind"] == "sales":
+            if options["vendor"]:
+                vendor = User.objects.filter(username=options["vendor"]).first()
+                if vendor is None:
+                    raise CommandError(f"Unknown vendor '{options['vendor']}'")
+                data["vendor"] = vendor.pk
+            data["payment_status"] = options["payment_status"]
+            form = SaleFilterForm(data)
+            model, export = Sale, export_sales_csv
+        else:
+            form = StockEntryFilterForm(data)
+            model, export = StockEntry, export_stock_entries_csv
+
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        # Archived months are read too when the range reaches them
+        lines = export(with_archive(form, model), chunk_size=options["chunk_size"])
+
+        out = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        try:
+            written = -1  # header line
+            for line in lines:
+                out.write(line)
+                written += 1
+        finally:
+            if options["output"]:
+                out.close()
+
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"✅ Exported {written} rows to {options['output']}"))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+from inventory.cache import invalidate
+from inventory.models import DailySalesSummary, SaleHistory
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily sales rollup from the full sale history, archived months included"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of rollup rows written per insert",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        revenue = ExpressionWrapper(
+            F("quantity") * F("selling_price"), output_field=DecimalField()
+        )
+        cost = ExpressionWrapper(
+            F("quantity") * F("cost_price_at_sale"), output_field=DecimalField()
+        )
+        # Live and archived sales: the rollup still covers archived months
+        rows = (
+            SaleHistory.objects.order_by()
+            .annotate(day=TruncDate("date_sold"))
+            .values("day", "sold_by", "product", "product__category", "payment_status")
+            .annotate(
+                sales_count=Count("id"),
+                units=Sum("quantity"),
+                revenue=Sum(revenue),
+                cost=Sum(cost),
+            )
+        )
+
+        deleted, _ = DailySalesSummary.objects.all().delete()
+        self.stdout.write(self.style.WARNING(f"⚠️ Removed {deleted} existing rollup rows"))
+
+        batch = []
+        created = 0
+        for row in rows.iterator():
+            batch.append(DailySalesSummary(
+                day=row["day"],
+                vendor_id=row["sold_by"],
+                product_id=row["product"],
+                category_id=row["product__category"],
+                payment_status=row["payment_status"],
+                sales_count=row["sales_count"],
+                units=row["units"],
+                revenue=row["revenue"],
+                cost=row["cost"],
+                profit=row["revenue"] - row["cost"],
+            ))
+            if len(batch) >= batch_size:
+                DailySalesSummary.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            DailySalesSummary.objects.bulk_create(batch)
+            created += len(batch)
+
+        invalidate("sales")
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {created} rollup rows"))
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.utils import local_day_range
+from inventory.ledger import write_checkpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshots every product's stock quantity and average cost at a local midnight so "
+        "point-in-time reads only replay the movements after it (run e.g. monthly from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--as-of", dest="as_of",
+            help="Day whose midnight to snapshot, YYYY-MM-DD (default: today, i.e. up to the end of yesterday)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["as_of"]) if options["as_of"] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Invalid date '{options['as_of']}', use YYYY-MM-DD")
+
+        as_of, _ = local_day_range(day)
+        if as_of > timezone.now():
+            raise CommandError("Checkpoints must be in the past: later movements are still being written")
+
+        written = write_checkpoint(as_of)
+        self.stdout.write(self.style.SUCCESS(f"✅ Checkpointed {written} products as of {as_of:%Y-%m-%d %H:%M %Z}"))
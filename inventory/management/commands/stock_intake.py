@@ -0,0 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.intake import bulk_intake, parse_intake_csv
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Receives a supplier delivery CSV (product, quantity, buying_price, selling_price) in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import")
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving")
+        parser.add_argument("--user", help="Username recorded as added_by")
+
+    def handle(self, *args, **options):
+        added_by = None
+        if options["user"]:
+            added_by = User.objects.filter(username=options["user"]).first()
+            if added_by is None:
+                raise CommandError(f"Unknown user '{options['user']}'")
+
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as f:
+                lines = parse_intake_csv(f)
+            report = bulk_intake(lines, added_by=added_by, dry_run=options["dry_run"])
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+
+        for row in report:
+            self.stdout.write(
+                f"{row['product'].name}: {row['lines']} line(s), "
+                f"qty {row['quantity_before']} -> {row['quantity_after']}, "
+                f"cost {row['buying_price_before']} -> {row['buying_price_after']}, "
+                f"sell {row['selling_price_before']} -> {row['selling_price_after']}"
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"⚠️ Dry run: {len(lines)} line(s) checked, nothing saved"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Received {len(lines)} line(s) for {len(report)} product(s)"))
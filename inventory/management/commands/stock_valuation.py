@@ -0,0 +1,47 @@
+import csv
+import sys
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.utils import local_day_range
+from inventory.ledger import stock_at
+
+
+class Command(BaseCommand):
+    help = "Reports stock units and value at average cost at the end of a given day, from the movement ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--at", help="Day, YYYY-MM-DD: stock at the end of it (default: now)")
+        parser.add_argument("--output", "-o", help="Also write per-product rows to this CSV file ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options["at"]:
+            try:
+                _, when = local_day_range(last_day=date.fromisoformat(options["at"]))
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['at']}', use YYYY-MM-DD")
+        else:
+            when = timezone.now()
+
+        state = stock_at(when)
+        units = sum(quantity for quantity, _ in state.values())
+        value = sum(quantity * cost for quantity, cost in state.values())
+
+        if options["output"]:
+            out = sys.stdout if options["output"] == "-" else open(options["output"], "w", newline="")
+            try:
+                writer = csv.writer(out)
+                writer.writerow(["Product ID", "Quantity", "Average Cost", "Value"])
+                for product_id, (quantity, cost) in sorted(state.items()):
+                    writer.writerow([product_id, quantity, cost, quantity * cost])
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Before {timezone.localtime(when):%Y-%m-%d %H:%M}: {units} units "
+            f"across {len(state)} products, valued at {value}"
+        ))
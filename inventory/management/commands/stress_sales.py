@@ -0,0 +1,227 @@
+import json
+import random
+import statistics
+import threading
+import time
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from core.testing import throwaway_database
+from inventory.models import CENTS, DailySalesSummary, Product, Sale, StockEntry, StockMovement
+from users.models import Role, User
+
+LOCK_ERRORS = ("database is locked", "database table is locked", "deadlock", "could not serialize")
+
+
+class Worker(threading.Thread):
+    """Runs a mix of sales and restocks; each thread uses its own connection."""
+
+    def __init__(self, index, product_ids, vendor, options, barrier):
+        super().__init__(name=f"stress-{index}")
+        self.rnd = random.Random(options["seed"] + index)
+        self.product_ids = product_ids
+        self.vendor = vendor
+        self.options = options
+        self.barrier = barrier
+
+        self.sales = self.restocks = self.rejected = self.failures = self.retries = 0
+        self.lock_wait = 0.0
+        self.latencies = []
+        self.errors = []
+
+    def run(self):
+        try:
+            self.barrier.wait()
+            for _ in range(self.options["ops"]):
+                product_id = self.rnd.choice(self.product_ids)
+                if self.rnd.random() < self.options["restock_ratio"]:
+                    self.attempt(self.restock, product_id)
+                else:
+                    self.attempt(self.sell, product_id)
+        finally:
+            connection.close()
+
+    def attempt(self, operation, product_id):
+        started = time.perf_counter()
+        for attempt in range(self.options["retries"] + 1):
+            tried = time.perf_counter()
+            try:
+                operation(product_id)
+                self.latencies.append((time.perf_counter() - started) * 1000)
+                return
+            except ValidationError:
+                self.rejected += 1  # not enough stock: the guard working, not an error
+                return
+            except OperationalError as e:
+                if not any(marker in str(e).lower() for marker in LOCK_ERRORS):
+                    raise
+                self.lock_wait += time.perf_counter() - tried
+                if attempt == self.options["retries"]:
+                    self.failures += 1
+                    self.errors.append(str(e))
+                    return
+                self.retries += 1
+                backoff = self.options["backoff"] * (2 ** attempt) * self.rnd.random()
+                self.lock_wait += backoff
+                time.sleep(backoff)
+
+    def sell(self, product_id):
+        product = Product.objects.get(pk=product_id)
+        Sale(
+            product=product,
+            quantity=self.rnd.randint(1, 3),
+            selling_price=max(product.selling_price, product.buying_price),
+            sold_by=self.vendor,
+        ).save()
+        self.sales += 1
+
+    def restock(self, product_id):
+        product = Product.objects.get(pk=product_id)
+        # Varied prices, so a lost update shows in the weighted average cost too
+        buying_price = Decimal(self.rnd.randint(8000, 12000)) / 100
+        StockEntry(
+            product=product,
+            quantity=self.rnd.randint(5, 20),
+            buying_price=buying_price,
+            selling_price=buying_price * Decimal("1.5"),
+        ).save()
+        self.restocks += 1
+
+
+def replay(product_ids):
+    """
+    Each product's (quantity, buying_price) from replaying its intakes and
+    sales one at a time, in the order the ledger recorded them: what the
+    product must hold if no concurrent update was lost.
+    """
+    state = {pk: (0, Decimal(0), Decimal(0)) for pk in product_ids}
+    movements = (
+        StockMovement.objects.filter(product__in=product_ids).order_by("id")
+        .values_list("product_id", "kind", "quantity_delta", "stock_entry__buying_price", "stock_entry__selling_price")
+    )
+    for product_id, kind, delta, entry_cost, entry_sell in movements:
+        quantity, cost, sell = state[product_id]
+        if kind == StockMovement.INTAKE:
+            quantity, cost, sell = StockEntry.weighted_prices(quantity, cost, sell, delta, entry_cost, entry_sell)
+            sell = sell.quantize(CENTS)
+        else:
+            quantity += delta
+        state[product_id] = (quantity, cost, sell)
+    return {pk: (quantity, cost) for pk, (quantity, cost, _) in state.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent sales and restocks at a throwaway database and reports throughput, "
+        "lock waits, retries, failures and whether every product's stock still balances"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--ops", type=int, default=200, help="Operations per thread")
+        parser.add_argument(
+            "--products", type=int, default=1,
+            help="Products to spread the load over (1 = every thread hits the same row)",
+        )
+        parser.add_argument("--initial-stock", type=int, default=100)
+        parser.add_argument("--restock-ratio", type=float, default=0.2)
+        parser.add_argument("--retries", type=int, default=5, help="Retries on lock errors")
+        parser.add_argument("--backoff", type=float, default=0.01, help="Base retry backoff in seconds")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        with throwaway_database(file_backed=True):
+            product_ids, vendor = self.seed(options)
+
+            barrier = threading.Barrier(options["threads"])
+            workers = [Worker(i, product_ids, vendor, options, barrier) for i in range(options["threads"])]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            report = self.report(workers, elapsed, product_ids, options)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+        if not report["consistent"]:
+            raise CommandError("Stock does not balance: see report['products']")
+
+    def seed(self, options):
+        role = Role.objects.create(name="vendor", display_name="Vendor")
+        vendor = User.objects.create_user("stress-vendor", "stress-vendor@example.com", None, role=role)
+
+        product_ids = []
+        for i in range(options["products"]):
+            product = Product.objects.create(name=f"Stress product {i}")
+            StockEntry(
+                product=product, quantity=options["initial_stock"],
+                buying_price=Decimal("100"), selling_price=Decimal("150"),
+            ).save()
+            product_ids.append(product.pk)
+        connection.close()  # workers open their own connections
+        return product_ids, vendor
+
+    def report(self, workers, elapsed, product_ids, options):
+        latencies = [ms for worker in workers for ms in worker.latencies]
+        sales = sum(worker.sales for worker in workers)
+
+        # Stock must equal everything received minus everything sold
+        intake = dict(
+            StockEntry.objects.values("product").annotate(total=Sum("quantity")).values_list("product", "total")
+        )
+        sold = dict(
+            Sale.objects.values("product").annotate(total=Sum("quantity")).values_list("product", "total")
+        )
+        rolled_up = dict(
+            DailySalesSummary.objects.values("product").annotate(total=Sum("units")).values_list("product", "total")
+        )
+        replayed = replay(product_ids)
+        products = {}
+        for product in Product.objects.filter(pk__in=product_ids):
+            expected = (intake.get(product.pk) or 0) - (sold.get(product.pk) or 0)
+            products[product.pk] = {
+                "quantity": product.quantity,
+                "expected": expected,
+                "replayed_quantity": replayed[product.pk][0],
+                "buying_price": str(product.buying_price),
+                "replayed_buying_price": str(replayed[product.pk][1]),
+                "rollup_units": rolled_up.get(product.pk) or 0,
+                "sold_units": sold.get(product.pk) or 0,
+            }
+
+        consistent = all(
+            row["quantity"] == row["expected"] == row["replayed_quantity"]
+            and Decimal(row["buying_price"]) == Decimal(row["replayed_buying_price"])
+            and row["rollup_units"] == row["sold_units"]
+            for row in products.values()
+        )
+        return {
+            "backend": connection.vendor,
+            "threads": options["threads"],
+            "products": products,
+            "elapsed_s": round(elapsed, 3),
+            "sales": sales,
+            "restocks": sum(worker.restocks for worker in workers),
+            "sales_per_s": round(sales / elapsed, 1) if elapsed else None,
+            "rejected_insufficient_stock": sum(worker.rejected for worker in workers),
+            "retries": sum(worker.retries for worker in workers),
+            "failures": sum(worker.failures for worker in workers),
+            "lock_wait_s": round(sum(worker.lock_wait for worker in workers), 3),
+            "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+            "p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+            "sample_errors": sorted({e for worker in workers for e in worker.errors})[:5],
+            "consistent": consistent,
+        }
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('buying_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date_added', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Stock Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subcategories', to='inventory.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Categories',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('buying_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('reorder_level', models.PositiveIntegerField(default=5)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.category')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost_price_at_sale', models.DecimalField(decimal_places=2, editable=False, max_digits=10)),
+                ('date_sold', models.DateTimeField(auto_now_add=True)),
+                ('payment_status', models.CharField(choices=[('Paid', 'Paid'), ('Credit', 'Credit')], default='Paid', max_length=20)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='inventory.product')),
+            ],
+            options={
+                'verbose_name': 'Sale',
+                'verbose_name_plural': 'Sales',
+                'ordering': ['-date_sold'],
+            },
+        ),
+    ]
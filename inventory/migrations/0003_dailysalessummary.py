@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_status', models.CharField(choices=[('Paid', 'Paid'), ('Credit', 'Credit')], max_length=20)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Summary',
+                'verbose_name_plural': 'Daily Sales Summaries',
+                'indexes': [models.Index(fields=['day', 'vendor'], name='inventory_d_day_67f7ac_idx'), models.Index(fields=['vendor', 'day'], name='inventory_d_vendor__70a3a6_idx'), models.Index(fields=['product', 'day'], name='inventory_d_product_d387d0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_dailysalessummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['quantity', 'reorder_level'], name='product_qty_reorder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['quantity'], name='product_needs_restock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date_sold', 'id'], name='sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sold_by', 'date_sold', 'id'], name='sale_vendor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['payment_status', 'date_sold', 'id'], name='sale_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockentry',
+            index=models.Index(fields=['date_added', 'id'], name='stockentry_date_idx'),
+        ),
+    ]
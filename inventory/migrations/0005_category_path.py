@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    """Walk the existing tree top-down, parents before children."""
+    Category = apps.get_model("inventory", "Category")
+    categories = list(Category.objects.all())
+    children = {}
+    for category in categories:
+        children.setdefault(category.parent_id, []).append(category)
+
+    level = [(c, "", "") for c in children.get(None, [])]
+    while level:
+        next_level = []
+        for category, parent_path, parent_name in level:
+            category.path = f"{parent_path}{category.pk:08d}/"
+            category.full_name = f"{parent_name} -> {category.name}" if parent_name else category.name
+            next_level += [(c, category.path, category.full_name) for c in children.get(category.pk, [])]
+        level = next_level
+    Category.objects.bulk_update(categories, ["path", "full_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='full_name',
+            field=models.CharField(default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
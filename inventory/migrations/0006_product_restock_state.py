@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:16
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.utils import timezone
+
+
+def fill_restock_state(apps, schema_editor):
+    Product = apps.get_model("inventory", "Product")
+    low = Product.objects.filter(quantity__lte=F("reorder_level"))
+    low.update(
+        below_reorder=True,
+        shortfall=F("reorder_level") - F("quantity") + Value(1),
+        went_low_at=timezone.now(),
+    )
+    Product.objects.filter(quantity__gt=F("reorder_level")).update(
+        below_reorder=False, shortfall=0, went_low_at=None,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_category_path'),
+    ]
+
+    # The two 0004 indexes served "quantity <= reorder_level" reads. Every
+    # low-stock read now filters on below_reorder instead, and
+    # product_restock_queue_idx (below) serves them, so they are dropped.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_qty_reorder_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_needs_restock_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='below_reorder',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='shortfall',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='went_low_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('below_reorder', True)), fields=['went_low_at', 'id'], name='product_restock_queue_idx'),
+        ),
+        migrations.RunPython(fill_restock_state, migrations.RunPython.noop),
+    ]
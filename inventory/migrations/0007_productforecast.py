@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_restock_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='inventory.product')),
+                ('moving_average', models.FloatField(default=0)),
+                ('smoothed_velocity', models.FloatField(default=0)),
+                ('days_of_cover', models.FloatField(blank=True, null=True)),
+                ('reorder_quantity', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['days_of_cover'], name='forecast_cover_idx')],
+            },
+        ),
+    ]
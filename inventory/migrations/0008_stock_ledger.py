@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_productforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('average_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='inventory.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('as_of', 'product'), name='checkpoint_as_of_product_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('intake', 'Intake'), ('sale', 'Sale'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('quantity_delta', models.IntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('balance_quantity', models.IntegerField()),
+                ('average_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.product')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.sale')),
+                ('stock_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.stockentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['occurred_at', 'id'], name='movement_time_idx'), models.Index(fields=['product', 'occurred_at', 'id'], name='movement_product_time_idx')],
+            },
+        ),
+    ]
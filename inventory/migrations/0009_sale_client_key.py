@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_stock_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_key__isnull', False)), fields=('sold_by', 'client_key'), name='sale_vendor_client_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_sale_client_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveBigIntegerField()),
+                ('catalog_version', models.PositiveBigIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='catalog_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['catalog_version'], name='product_catalog_version_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='product_quantity_non_negative'),
+        ),
+    ]
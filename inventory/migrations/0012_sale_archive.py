@@ -0,0 +1,96 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Live rows and archived rows as one relation (inventory.models.SaleHistory,
+# StockEntryHistory). Archived ids are the originals, so ids stay unique.
+SALE_COLUMNS = "id, product_id, quantity, selling_price, cost_price_at_sale, date_sold, sold_by_id, payment_status, client_key"
+STOCK_ENTRY_COLUMNS = "id, product_id, quantity, buying_price, selling_price, date_added, added_by_id"
+
+CREATE_VIEWS = [
+    f"CREATE VIEW inventory_salehistory AS "
+    f"SELECT {SALE_COLUMNS} FROM inventory_sale UNION ALL SELECT {SALE_COLUMNS} FROM inventory_archivedsale",
+    f"CREATE VIEW inventory_stockentryhistory AS "
+    f"SELECT {STOCK_ENTRY_COLUMNS} FROM inventory_stockentry "
+    f"UNION ALL SELECT {STOCK_ENTRY_COLUMNS} FROM inventory_archivedstockentry",
+]
+DROP_VIEWS = ["DROP VIEW inventory_salehistory", "DROP VIEW inventory_stockentryhistory"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_product_quantity_non_negative'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost_price_at_sale', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date_sold', models.DateTimeField()),
+                ('payment_status', models.CharField(choices=[('Paid', 'Paid'), ('Credit', 'Credit')], max_length=20)),
+                ('client_key', models.CharField(blank=True, max_length=64, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Sale History',
+                'db_table': 'inventory_salehistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StockEntryHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('buying_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date_added', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Stock Entry History',
+                'db_table': 'inventory_stockentryhistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost_price_at_sale', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date_sold', models.DateTimeField()),
+                ('payment_status', models.CharField(choices=[('Paid', 'Paid'), ('Credit', 'Credit')], max_length=20)),
+                ('client_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.product')),
+                ('sold_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date_sold', 'id'], name='archivedsale_date_idx'), models.Index(fields=['sold_by', 'date_sold', 'id'], name='archivedsale_vendor_date_idx'), models.Index(fields=['payment_status', 'date_sold', 'id'], name='archivedsale_payment_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedStockEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('buying_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date_added', models.DateTimeField()),
+                ('added_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived Stock Entries',
+                'indexes': [models.Index(fields=['date_added', 'id'], name='archivedentry_date_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEWS, DROP_VIEWS),
+    ]
@@ -2,8 +2,56 @@ import math
 
 from decimal import Decimal
 
-from django.db import models, transaction
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Substr
+from django.db.models.lookups import LessThanOrEqual
+from django.db.models.sql import UpdateQuery
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .cache import invalidate
+
+
+CENTS = Decimal("0.01")
+
+# Materialized path: each category stores its ancestors' zero-padded pks, e.g.
+# "00000001/00000004/". A subtree is then the index range [path, path + "~"):
+# every descendant path extends the prefix with digits and "/", all below "~".
+PATH_STEP = 8
+SUBTREE_END = "~"
+
+
+class CategoryQuerySet(models.QuerySet):
+    def with_subtree_totals(self):
+        """
+        Annotate each category with stock and sales rolled up over its whole
+        subtree: stock_quantity, stock_value, units_sold and revenue.
+        One query; each total is a correlated range scan on the path index.
+        """
+        def within(field):
+            return {
+                f"{field}__path__gte": OuterRef("path"),
+                f"{field}__path__lt": Concat(OuterRef("path"), Value(SUBTREE_END)),
+            }
+
+        def total(queryset, expression, output_field):
+            return Coalesce(
+                Subquery(queryset.order_by().values(
+                    total=Func(expression, function="SUM", output_field=output_field)
+                )),
+                Value(0), output_field=output_field,
+            )
+
+        products = Product.objects.filter(**within("category"))
+        sales = DailySalesSummary.objects.filter(**within("category"))
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            stock_quantity=total(products, F("quantity"), models.IntegerField()),
+            stock_value=total(products, F("quantity") * F("buying_price"), money),
+            units_sold=total(sales, F("units"), models.IntegerField()),
+            revenue=total(sales, F("revenue"), money),
+        )
 
 
 class Category(models.Model):
@@ -13,12 +61,193 @@ class Category(models.Model):
         null=True, blank=True, related_name="subcategories"
     )
 
+    # Maintained by save(); never edit by hand
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    full_name = models.CharField(max_length=1000, editable=False, default="")
+
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.parent} -> {self.name}" if self.parent else self.name
-    
+        return self.full_name or self.name
+
     class Meta:
         verbose_name_plural = "Categories"
 
+    @property
+    def depth(self):
+        return self.path.count("/") - 1
+
+    def ancestors(self, include_self=True):
+        """Breadcrumb from the root down, in one query."""
+        pks = [int(segment) for segment in self.path.split("/") if segment]
+        if not include_self:
+            pks = pks[:-1]
+        return Category.objects.filter(pk__in=pks).order_by("path")
+
+    def descendants(self, include_self=True):
+        queryset = Category.objects.filter(**self.subtree_lookup())
+        return queryset if include_self else queryset.exclude(pk=self.pk)
+
+    def subtree_lookup(self, field=""):
+        """Filter kwargs matching `field` (a Category relation) anywhere in this subtree."""
+        prefix = f"{field}__" if field else ""
+        return {f"{prefix}path__gte": self.path, f"{prefix}path__lt": self.path + SUBTREE_END}
+
+    def clean(self):
+        if self.pk and self.parent_id:
+            parent_path = Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+            if f"{self.pk:0{PATH_STEP}d}" in parent_path.split("/"):
+                raise ValidationError("A category cannot be moved under itself or its subcategories.")
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Read the parent fresh: a cached self.parent may predate a move
+        if self.parent_id:
+            parent_path, parent_name = (
+                Category.objects.values_list("path", "full_name").get(pk=self.parent_id)
+            )
+            self.full_name = f"{parent_name} -> {self.name}"
+        else:
+            parent_path = ""
+            self.full_name = self.name
+
+        if self.pk is None:
+            super().save(*args, **kwargs)
+            self.path = f"{parent_path}{self.pk:0{PATH_STEP}d}/"
+            super().save(update_fields=["path"])
+            return
+
+        self.clean()
+        old_path, old_name = Category.objects.values_list("path", "full_name").get(pk=self.pk)
+        self.path = f"{parent_path}{self.pk:0{PATH_STEP}d}/"
+        super().save(*args, **kwargs)
+
+        # Re-root the whole subtree with one UPDATE on a moved or renamed category
+        if (old_path, old_name) != (self.path, self.full_name):
+            Category.objects.filter(
+                path__gt=old_path, path__lt=old_path + SUBTREE_END,
+            ).update(
+                path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+                full_name=Concat(Value(self.full_name), Substr("full_name", len(old_name) + 1)),
+            )
+
+
+def _update_returning(queryset, values, returning):
+    """
+    queryset.update(**values) for a queryset matching at most one row,
+    returning that row's `returning` fields after the update, or None when
+    nothing matched. Backends with UPDATE ... RETURNING do it in one
+    statement; others update and then read the row back by pk, which sees
+    the write because the update still holds the row lock.
+    """
+    connection = connections[queryset.db]
+    fields = [queryset.model._meta.get_field(name) for name in returning]
+
+    if connection.vendor not in ("postgresql", "sqlite") or not connection.features.can_return_columns_from_insert:
+        pks = list(queryset.values_list("pk", flat=True)[:1])
+        if not pks or not queryset.filter(pk=pks[0]).update(**values):
+            return None
+        return queryset.model._base_manager.using(queryset.db).values_list(*returning).get(pk=pks[0])
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {columns}", params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    # The conversions the ORM applies to these columns when it reads them
+    values = []
+    for field, value in zip(fields, row):
+        column = field.get_col(queryset.model._meta.db_table)
+        for converter in connection.ops.get_db_converters(column) + field.get_db_converters(connection):
+            value = converter(value, column, connection)
+        values.append(value)
+    return tuple(values)
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter behind Product.catalog_version. Every catalog write
+    bumps it inside its own transaction; the UPDATE holds the row lock until
+    commit, so versions become visible in the order they were handed out and
+    a client that has seen version N has seen everything up to N.
+
+    Writers bump before they touch any product row, so the counter is always
+    the first lock taken and concurrent writers can't deadlock on it.
+    """
+    value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def bump(cls):
+        """Take the next version. Call inside the transaction doing the write."""
+        row = _update_returning(cls.objects.filter(pk=1), {"value": F("value") + 1}, ["value"])
+        if row is None:
+            cls.objects.get_or_create(pk=1)
+            return cls.bump()
+        return row[0]
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list("value", flat=True).first() or 0
+
+    @staticmethod
+    def stamp(products, version):
+        """Give a batch of products the version bumped for it; bulk writers include "catalog_version" in the update."""
+        for product in products:
+            product.catalog_version = version
+
+
+class CatalogDeletion(models.Model):
+    """Tombstone for a deleted product, so catalog deltas can report it."""
+    product_id = models.PositiveBigIntegerField()
+    catalog_version = models.PositiveBigIntegerField(db_index=True)
+
+
+class ProductQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Keep queryset updates in step with save(): stamp a fresh catalog
+        version (so catalog deltas and ETags see the change), recompute the
+        restock state when quantity or reorder_level change, and invalidate
+        the cached stock and catalog blocks. Callers that manage all three
+        themselves (StockEntry._receive, bulk_update with "catalog_version")
+        pass their own catalog_version.
+        """
+        if "catalog_version" in kwargs:
+            return super().update(**kwargs)
+        if kwargs.keys() & {"quantity", "reorder_level"} and not kwargs.keys() & set(Product.RESTOCK_FIELDS):
+            kwargs.update(self._restock_state(kwargs))
+        with transaction.atomic(using=self.db):
+            kwargs["catalog_version"] = CatalogVersion.bump()  # first lock, see CatalogVersion
+            rows = super().update(**kwargs)
+            invalidate("stock", "catalog")
+        return rows
+
+    @staticmethod
+    def _restock_state(kwargs):
+        # Product.refresh_restock_state() as SQL over the new values, so each row gets its own
+        quantity, reorder_level = (
+            value if hasattr(value, "resolve_expression") else Value(value)
+            for value in (kwargs.get("quantity", F("quantity")), kwargs.get("reorder_level", F("reorder_level")))
+        )
+        low = Q(LessThanOrEqual(quantity, reorder_level))
+        return {
+            "below_reorder": Case(When(low, then=Value(True)), default=Value(False)),
+            "shortfall": Case(
+                When(low, then=reorder_level - quantity + 1),
+                default=Value(0), output_field=models.PositiveIntegerField(),
+            ),
+            "went_low_at": Case(
+                When(low & Q(below_reorder=True, went_low_at__isnull=False), then=F("went_low_at")),
+                When(low, then=Value(timezone.now())),
+                default=None, output_field=models.DateTimeField(),
+            ),
+        }
+
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -29,9 +258,41 @@ class Product(models.Model):
     quantity = models.PositiveIntegerField(default=0)
     reorder_level = models.PositiveIntegerField(default=5)
 
+    # Denormalized restock state, kept in step with quantity by save()
+    below_reorder = models.BooleanField(default=True, editable=False)
+    shortfall = models.PositiveIntegerField(default=0, editable=False)
+    went_low_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Version of the last write, for catalog deltas (see CatalogVersion)
+    catalog_version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    RESTOCK_FIELDS = ["below_reorder", "shortfall", "went_low_at"]
+
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        self.refresh_restock_state()
+        self.catalog_version = CatalogVersion.bump()
+        super().save(*args, **kwargs)
+
+    def refresh_restock_state(self):
+        """
+        Recompute below_reorder, shortfall (units needed to get back above
+        the reorder level) and went_low_at from quantity. Bulk writers must
+        call this and include RESTOCK_FIELDS in their bulk_update.
+        """
+        low = self.needs_restock()
+        if low and not (self.below_reorder and self.went_low_at):
+            self.went_low_at = timezone.now()
+        elif not low:
+            self.went_low_at = None
+        self.below_reorder = low
+        self.shortfall = self.reorder_level - self.quantity + 1 if low else 0
+
     @property
     def stock_value(self):
         return self.buying_price * self.quantity
@@ -43,6 +304,23 @@ class Product(models.Model):
     def needs_restock(self):
         return self.quantity <= self.reorder_level
 
+    class Meta:
+        indexes = [
+            # The restock queue: only flagged rows, newest alert first. Reads
+            # cost the queue length, not the catalog size. Partial indexes are
+            # skipped on backends without support.
+            models.Index(
+                fields=["went_low_at", "id"],
+                condition=models.Q(below_reorder=True),
+                name="product_restock_queue_idx",
+            ),
+            models.Index(fields=["catalog_version"], name="product_catalog_version_idx"),
+        ]
+        constraints = [
+            # Sale.save's conditional decrement relies on this as a backstop
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name="product_quantity_non_negative"),
+        ]
+
 
 class StockEntry(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_entries")
@@ -55,46 +333,80 @@ class StockEntry(models.Model):
     def __str__(self):
         return f"{self.quantity} {self.product.name} added on {self.date_added.date()}"
     
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            old_qty = self.product.quantity
-            old_cost = self.product.buying_price
-            old_sell = self.product.selling_price
-
-            # Totals
-            old_total_cost = old_qty * old_cost
-            old_total_sell = old_qty * old_sell
+    @staticmethod
+    def weighted_prices(old_qty, old_cost, old_sell, new_qty, new_cost, new_sell):
+        """
+        Blend an intake into existing stock.
+        Returns (total_qty, avg_cost, avg_sell); cost is rounded up to the nearest 10.
+        """
+        # Totals
+        old_total_cost = old_qty * old_cost
+        old_total_sell = old_qty * old_sell
 
-            new_qty = self.quantity
-            new_cost = self.buying_price
-            new_sell = self.selling_price
+        new_total_cost = new_qty * new_cost
+        new_total_sell = new_qty * new_sell
 
-            new_total_cost = new_qty * new_cost
-            new_total_sell = new_qty * new_sell
+        total_qty = old_qty + new_qty
 
-            total_qty = old_qty + new_qty
+        if total_qty > 0:
+            avg_cost = (old_total_cost + new_total_cost) / total_qty
+            avg_sell = (old_total_sell + new_total_sell) / total_qty
+        else:
+            avg_cost = new_cost
+            avg_sell = new_sell
 
-            if total_qty > 0:
-                avg_cost = (old_total_cost + new_total_cost) / total_qty
-                avg_sell = (old_total_sell + new_total_sell) / total_qty
-            else:
-                avg_cost = new_cost
-                avg_sell = new_sell
+        # Round cost up to nearest 10
+        avg_cost = Decimal(math.ceil(avg_cost / 10) * 10)
 
-            # Round cost up to nearest 10
-            avg_cost = Decimal(math.ceil(avg_cost / 10) * 10)
+        return total_qty, avg_cost, avg_sell
 
-            # Update product
-            self.product.quantity = total_qty
-            self.product.buying_price = avg_cost
-            self.product.selling_price = avg_sell
-            self.product.save()
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        if is_new:
+            self._receive()
 
         super().save(*args, **kwargs)
 
+        if is_new:
+            StockMovement.build(
+                self.product, StockMovement.INTAKE, self.quantity, self.buying_price, stock_entry=self,
+            ).save()
+            # The product was written with a queryset update, which sends no post_save
+            invalidate("stock", "catalog")
+
+    def _receive(self):
+        """
+        Blend this entry into its product under a short row lock.
+
+        The product is re-read with SELECT ... FOR UPDATE rather than trusted
+        from memory, so concurrent restocks and sales can't be lost, and only
+        the changed columns are written back. The weighted averages stay in
+        Python: the cost rounding is decimal arithmetic SQLite can't do
+        exactly in SQL.
+        """
+        version = CatalogVersion.bump()  # first lock, see CatalogVersion; on SQLite it takes the write lock
+        product = Product.objects.select_for_update().get(pk=self.product_id)
+
+        total_qty, avg_cost, avg_sell = self.weighted_prices(
+            product.quantity, product.buying_price, product.selling_price,
+            self.quantity, self.buying_price, self.selling_price,
+        )
+        product.quantity = total_qty
+        product.buying_price = avg_cost
+        product.selling_price = avg_sell.quantize(CENTS)  # what the column stores
+        product.refresh_restock_state()
+        CatalogVersion.stamp([product], version)
+
+        fields = ["quantity", "buying_price", "selling_price", "catalog_version", *Product.RESTOCK_FIELDS]
+        Product.objects.filter(pk=product.pk).update(**{field: getattr(product, field) for field in fields})
+        self.product = product
 
     class Meta:
         verbose_name_plural = "Stock Entries"
+        indexes = [
+            models.Index(fields=["date_added", "id"], name="stockentry_date_idx"),
+        ]
 
 
 class Sale(models.Model):
@@ -119,30 +431,60 @@ class Sale(models.Model):
     payment_status = models.CharField(
         max_length=20, choices=PAYMENT_CHOICES, default="Paid"
     )
+    client_key = models.CharField(
+        max_length=64, null=True, blank=True, editable=False
+    )  # idempotency key from an offline POS client (see sync_batch)
 
     class Meta:
         ordering = ["-date_sold"]
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
+        indexes = [
+            models.Index(fields=["date_sold", "id"], name="sale_date_idx"),
+            models.Index(fields=["sold_by", "date_sold", "id"], name="sale_vendor_date_idx"),
+            models.Index(fields=["payment_status", "date_sold", "id"], name="sale_payment_date_idx"),
+        ]
+        constraints = [
+            # A retried sync can never record the same client sale twice
+            models.UniqueConstraint(
+                fields=["sold_by", "client_key"],
+                condition=models.Q(client_key__isnull=False),
+                name="sale_vendor_client_key_uniq",
+            ),
+        ]
 
     def __str__(self):
         return f"Sale of {self.product.name} ({self.quantity}) by {self.sold_by or 'Unknown'}"
 
+    @staticmethod
+    def line_errors(product, quantity, selling_price, available=None):
+        """
+        Stock and pricing problems with selling `quantity` of `product` at
+        `selling_price`; `available` overrides product.quantity (e.g. stock
+        left after earlier lines of a batch).
+        """
+        available = product.quantity if available is None else available
+        errors = []
+        if quantity > available:
+            errors.append(
+                f"Not enough stock for {product.name}. "
+                f"Available: {available}, Requested: {quantity}"
+            )
+
+        # Selling price may not be below product cost
+        if selling_price < product.buying_price:
+            errors.append(
+                f"Selling price ({selling_price}) for {product.name} cannot be lower "
+                f"than current cost price ({product.buying_price})"
+            )
+        return errors
+
     def clean(self):
         """Validations before saving."""
         if self.pk is None:  # only on creation
-            if self.quantity > self.product.quantity:
-                raise ValidationError(
-                    f"Not enough stock for {self.product.name}. "
-                    f"Available: {self.product.quantity}, Requested: {self.quantity}"
-                )
-
-            # Validate selling price is not below product cost
-            if self.selling_price < self.product.buying_price:
-                raise ValidationError(
-                    f"Selling price ({self.selling_price}) cannot be lower "
-                    f"than current cost price ({self.product.buying_price})"
-                )
+            errors = self.line_errors(self.product, self.quantity, self.selling_price)
+            if errors:
+                raise ValidationError(errors)
 
     @transaction.atomic
     def save(self, *args, **kwargs):
@@ -153,25 +495,214 @@ class Sale(models.Model):
         - Store cost price snapshot
         """
         is_new = self.pk is None
-        self.clean()
 
         if is_new:
-            # Lock product row to avoid race conditions
-            product = Product.objects.select_for_update().get(pk=self.product.pk)
+            product = self._deduct_stock()
+        else:
+            # Back out the previous version of this sale from the rollup
+            DailySalesSummary.record(Sale.objects.get(pk=self.pk), sign=-1)
 
-            if self.quantity > product.quantity:
-                raise ValidationError(
-                    f"Stock changed! Available: {product.quantity}, Requested: {self.quantity}"
-                )
+        super().save(*args, **kwargs)
+        DailySalesSummary.record(self)
 
-            # Record product cost price at sale time
-            self.cost_price_at_sale = product.buying_price
+        if is_new:
+            StockMovement.build(
+                product, StockMovement.SALE, -self.quantity, self.cost_price_at_sale, sale=self,
+            ).save()
+            # The product was written with a queryset update, which sends no post_save
+            invalidate("stock", "catalog")
 
-            # Deduct stock
-            product.quantity -= self.quantity
-            product.save()
+    def _deduct_stock(self):
+        """
+        Take this sale's quantity off its product with one conditional
+        UPDATE: the stock and price checks are in the WHERE clause, the
+        restock state is recomputed in SET, and the cost snapshot comes back
+        with RETURNING where the backend has it. The row lock is held only
+        from this statement to commit. Zero rows updated means the sale is
+        invalid, and only then is the product read to say why.
+
+        Returns the sale's product with its new state.
+        """
+        n = self.quantity
+        version = CatalogVersion.bump()
+        low = Q(quantity__lte=F("reorder_level") + n)  # SET sees the old quantity
+        row = _update_returning(
+            Product.objects.filter(pk=self.product_id, quantity__gte=n, buying_price__lte=self.selling_price),
+            {
+                "quantity": F("quantity") - n,
+                "below_reorder": Case(When(low, then=Value(True)), default=Value(False)),
+                "shortfall": Case(When(low, then=F("reorder_level") - F("quantity") + n + 1), default=Value(0)),
+                "went_low_at": Case(
+                    When(~low, then=Value(None)),
+                    When(below_reorder=True, went_low_at__isnull=False, then=F("went_low_at")),
+                    default=Value(timezone.now()),
+                ),
+                "catalog_version": Value(version),
+            },
+            ["quantity", "buying_price", "category_id", *Product.RESTOCK_FIELDS, "catalog_version"],
+        )
+        if row is None:
+            product = Product.objects.filter(pk=self.product_id).first()
+            if product is None:
+                raise ValidationError(f"Product #{self.product_id} does not exist.")
+            raise ValidationError(
+                self.line_errors(product, n, self.selling_price)
+                or f"Stock changed! Available: {product.quantity}, Requested: {n}"
+            )
+
+        # Bring the caller's instance up to date instead of reading it back
+        product = self.product
+        (product.quantity, product.buying_price, product.category_id,
+         product.below_reorder, product.shortfall, product.went_low_at, product.catalog_version) = row
+        self.cost_price_at_sale = product.buying_price
+        return product
+
+    @classmethod
+    @transaction.atomic
+    def checkout(cls, lines, sold_by=None, payment_status="Paid"):
+        """
+        Record a whole basket in one transaction.
 
-        super().save(*args, **kwargs)
+        `lines` is an iterable of dicts with `product` (id), `quantity` and
+        `selling_price`. Every product in the basket is locked with a single
+        SELECT ... FOR UPDATE ordered by id (so concurrent baskets can't
+        deadlock), the sales are bulk inserted and the stock decrements are
+        written with one bulk update. Any invalid line rolls back the lot.
+        """
+        lines = list(lines)
+        if not lines:
+            raise ValidationError("The basket is empty.")
+
+        version = CatalogVersion.bump()
+        products = {
+            p.pk: p
+            for p in Product.objects.select_for_update()
+            .filter(pk__in={line["product"] for line in lines})
+            .order_by("pk")
+        }
+
+        # Each line against the stock left after the lines before it
+        available = {pk: product.quantity for pk, product in products.items()}
+        errors = []
+        for line in lines:
+            product = products.get(line["product"])
+            if product is None:
+                errors.append(f"Product #{line['product']} does not exist.")
+                continue
+            errors += cls.line_errors(product, line["quantity"], line["selling_price"], available[product.pk])
+            available[product.pk] -= line["quantity"]
+        if errors:
+            raise ValidationError(errors)
+
+        return cls._record_batch(version, [
+            cls(
+                product=products[line["product"]],
+                quantity=line["quantity"],
+                selling_price=line["selling_price"],
+                cost_price_at_sale=products[line["product"]].buying_price,
+                sold_by=sold_by,
+                payment_status=payment_status,
+            )
+            for line in lines
+        ])
+
+    @classmethod
+    @transaction.atomic
+    def sync_batch(cls, lines, sold_by):
+        """
+        Record sales queued by an offline POS client.
+
+        Each line is a dict with a client-generated `key`, `product` (id),
+        `quantity`, `selling_price` and `payment_status`. A key this vendor
+        has already synced is reported as a duplicate and never applied
+        twice, so a client can retry a batch until it gets an answer.
+        Other lines are checked like any sale, against the stock left after
+        the earlier lines; valid lines are written together with the same
+        bulk path as checkout, invalid ones are rejected on their own.
+
+        Returns one result dict per line, in order.
+        """
+        lines = list(lines)
+        version = CatalogVersion.bump()
+        products = {
+            p.pk: p
+            for p in Product.objects.select_for_update()
+            .filter(pk__in={line["product"] for line in lines})
+            .order_by("pk")
+        }
+        # Looked up under the product locks, so a concurrent retry waits for us
+        synced = dict(
+            cls.objects.filter(sold_by=sold_by, client_key__in={line["key"] for line in lines})
+            .values_list("client_key", "pk")
+        )
+        available = {pk: product.quantity for pk, product in products.items()}
+
+        results, pending = [], {}
+        for line in lines:
+            key = line["key"]
+            if key in synced or key in pending:
+                results.append({"key": key, "status": "duplicate", "sale": synced.get(key)})
+                continue
+
+            product = products.get(line["product"])
+            if product is None:
+                errors = [f"Product #{line['product']} does not exist."]
+            else:
+                errors = cls.line_errors(product, line["quantity"], line["selling_price"], available[product.pk])
+            if errors:
+                results.append({"key": key, "status": "rejected", "errors": errors})
+                continue
+
+            available[product.pk] -= line["quantity"]
+            pending[key] = cls(
+                product=product,
+                quantity=line["quantity"],
+                selling_price=line["selling_price"],
+                cost_price_at_sale=product.buying_price,
+                sold_by=sold_by,
+                payment_status=line["payment_status"],
+                client_key=key,
+            )
+            results.append({"key": key, "status": "created"})
+
+        created = {sale.client_key: sale.pk for sale in cls._record_batch(version, pending.values())}
+        for result in results:
+            if result["status"] != "rejected" and result.get("sale") is None:
+                result["sale"] = created[result["key"]]
+        return results
+
+    @classmethod
+    def _record_batch(cls, version, sales):
+        """
+        Insert validated, unsaved sales whose products are locked, and apply
+        their stock, ledger and rollup side effects in bulk. `version` is the
+        catalog version bumped before the locks were taken.
+        """
+        sales = cls.objects.bulk_create(sales)
+        if not sales:
+            return sales
+
+        # Line by line, so each movement carries its own running balance
+        movements = []
+        for sale in sales:
+            sale.product.quantity -= sale.quantity
+            movements.append(StockMovement.build(
+                sale.product, StockMovement.SALE, -sale.quantity, sale.cost_price_at_sale, sale=sale,
+            ))
+        products = {sale.product_id: sale.product for sale in sales}
+        for product in products.values():
+            product.refresh_restock_state()
+        CatalogVersion.stamp(products.values(), version)
+        Product.objects.bulk_update(
+            products.values(), ["quantity", "catalog_version", *Product.RESTOCK_FIELDS],
+        )
+        StockMovement.objects.bulk_create(movements)
+
+        DailySalesSummary.record_many(sales)
+
+        # Bulk writes skip the post_save signals that normally invalidate these
+        invalidate("sales", "stock", "catalog")
+        return sales
 
     @property
     def total_sale_value(self) -> Decimal:
@@ -182,3 +713,307 @@ class Sale(models.Model):
     def total_profit(self) -> Decimal:
         """Profit made from this sale, based on cost at sale time."""
         return (self.selling_price - self.cost_price_at_sale) * self.quantity
+
+
+class DailySalesSummary(models.Model):
+    """
+    Per-day sales rollup, one row per vendor, product and payment status.
+    Kept up to date by Sale.save and, for every kind of delete, a post_delete
+    receiver in inventory.signals; rebuild from history with
+    `manage.py rebuild_sales_summary`.
+    """
+    day = models.DateField()
+    vendor = models.ForeignKey(
+        "users.User", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True
+    )  # product category when the row was first written
+    payment_status = models.CharField(max_length=20, choices=Sale.PAYMENT_CHOICES)
+
+    sales_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Daily Sales Summary"
+        verbose_name_plural = "Daily Sales Summaries"
+        indexes = [
+            models.Index(fields=["day", "vendor"]),
+            models.Index(fields=["vendor", "day"]),
+            models.Index(fields=["product", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id} ({self.payment_status}): {self.units} units"
+
+    @classmethod
+    def record(cls, sale, sign=1):
+        """Add (sign=1) or remove (sign=-1) a sale's totals from its rollup row."""
+        revenue = sale.total_sale_value * sign
+        cost = sale.cost_price_at_sale * sale.quantity * sign
+        key = {
+            "day": timezone.localdate(sale.date_sold),
+            "vendor_id": sale.sold_by_id,
+            "product_id": sale.product_id,
+            "payment_status": sale.payment_status,
+        }
+
+        # Sale.save holds the product row lock, so rows for the same
+        # product are never created twice concurrently.
+        updated = cls.objects.filter(**key).update(
+            sales_count=F("sales_count") + sign,
+            units=F("units") + sale.quantity * sign,
+            revenue=F("revenue") + revenue,
+            cost=F("cost") + cost,
+            profit=F("profit") + (revenue - cost),
+        )
+        # Nothing to take a removal out of, e.g. the row went first in a
+        # cascade delete of the product
+        if not updated and sign > 0:
+            cls.objects.create(
+                category_id=sale.product.category_id,
+                sales_count=sign,
+                units=sale.quantity * sign,
+                revenue=revenue,
+                cost=cost,
+                profit=revenue - cost,
+                **key,
+            )
+
+    @classmethod
+    def record_many(cls, sales):
+        """
+        Add a batch of new sales to the rollup: one read of the affected
+        rows, then one bulk update and one bulk insert.
+        """
+        totals = {}
+        for sale in sales:
+            key = (timezone.localdate(sale.date_sold), sale.sold_by_id, sale.product_id, sale.payment_status)
+            row = totals.setdefault(key, {
+                "category_id": sale.product.category_id,
+                "sales_count": 0, "units": 0,
+                "revenue": Decimal(0), "cost": Decimal(0),
+            })
+            row["sales_count"] += 1
+            row["units"] += sale.quantity
+            row["revenue"] += sale.total_sale_value
+            row["cost"] += sale.cost_price_at_sale * sale.quantity
+        if not totals:
+            return
+
+        existing = cls.objects.filter(
+            day__in={key[0] for key in totals},
+            product_id__in={key[2] for key in totals},
+        )
+        to_update = []
+        for summary in existing:
+            key = (summary.day, summary.vendor_id, summary.product_id, summary.payment_status)
+            row = totals.pop(key, None)
+            if row is None:
+                continue
+            summary.sales_count += row["sales_count"]
+            summary.units += row["units"]
+            summary.revenue += row["revenue"]
+            summary.cost += row["cost"]
+            summary.profit += row["revenue"] - row["cost"]
+            to_update.append(summary)
+
+        cls.objects.bulk_update(to_update, ["sales_count", "units", "revenue", "cost", "profit"])
+        cls.objects.bulk_create([
+            cls(
+                day=day, vendor_id=vendor_id, product_id=product_id,
+                payment_status=payment_status, profit=row["revenue"] - row["cost"], **row,
+            )
+            for (day, vendor_id, product_id, payment_status), row in totals.items()
+        ])
+
+
+class ProductForecast(models.Model):
+    """
+    Demand forecast per product, written in bulk by `manage.py forecast`
+    (see inventory.forecasting). Velocities are units per day.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="forecast"
+    )
+    moving_average = models.FloatField(default=0)
+    smoothed_velocity = models.FloatField(default=0)
+    days_of_cover = models.FloatField(null=True, blank=True)  # None: no recent demand
+    reorder_quantity = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["days_of_cover"], name="forecast_cover_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.smoothed_velocity:.2f}/day"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: one row per change to a product's quantity,
+    with the running balance and average cost right after it. Written by
+    StockEntry.save, Sale.save and the bulk paths; never updated. Point-in-time
+    reads go through inventory.ledger.
+    """
+    INTAKE, SALE, ADJUSTMENT = "intake", "sale", "adjustment"
+    KIND_CHOICES = [
+        (INTAKE, "Intake"),
+        (SALE, "Sale"),
+        (ADJUSTMENT, "Adjustment"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="movements")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity_delta = models.IntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    balance_quantity = models.IntegerField()
+    average_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    # Sources are kept as references only: the ledger outlives them
+    stock_entry = models.ForeignKey(StockEntry, on_delete=models.SET_NULL, null=True, blank=True)
+    sale = models.ForeignKey(Sale, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["occurred_at", "id"], name="movement_time_idx"),
+            models.Index(fields=["product", "occurred_at", "id"], name="movement_product_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.kind} {self.quantity_delta:+d} -> {self.balance_quantity}"
+
+    @classmethod
+    def build(cls, product, kind, quantity_delta, unit_cost, **source):
+        """Unsaved movement for `product`, whose quantity and cost already include it."""
+        return cls(
+            product=product,
+            kind=kind,
+            quantity_delta=quantity_delta,
+            unit_cost=unit_cost,
+            balance_quantity=product.quantity,
+            average_cost=product.buying_price,
+            **source,
+        )
+
+
+class StockCheckpoint(models.Model):
+    """
+    Snapshot of every product's quantity and average cost as of a moment,
+    so point-in-time reads only replay the movements after it.
+    Written by `manage.py stock_checkpoint` and `manage.py backfill_ledger`.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="checkpoints")
+    as_of = models.DateTimeField()
+    quantity = models.IntegerField()
+    average_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["as_of", "product"], name="checkpoint_as_of_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.as_of}: {self.quantity}"
+
+
+class ArchivedSale(models.Model):
+    """
+    A Sale from a closed month, moved here by `manage.py archive_sales` to
+    keep the live table small. Same columns and id as the original; the
+    rollups it was counted in are left as they were.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the original Sale id
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_price_at_sale = models.DecimalField(max_digits=10, decimal_places=2)
+    date_sold = models.DateTimeField()
+    sold_by = models.ForeignKey("users.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    payment_status = models.CharField(max_length=20, choices=Sale.PAYMENT_CHOICES)
+    client_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_sold", "id"], name="archivedsale_date_idx"),
+            models.Index(fields=["sold_by", "date_sold", "id"], name="archivedsale_vendor_date_idx"),
+            models.Index(fields=["payment_status", "date_sold", "id"], name="archivedsale_payment_date_idx"),
+        ]
+
+    __str__ = Sale.__str__
+
+
+class ArchivedStockEntry(models.Model):
+    """A StockEntry from a closed month, moved here by `manage.py archive_sales`."""
+    id = models.BigIntegerField(primary_key=True)  # the original StockEntry id
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+    buying_price = models.DecimalField(max_digits=10, decimal_places=2)
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    date_added = models.DateTimeField()
+    added_by = models.ForeignKey("users.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    class Meta:
+        verbose_name_plural = "Archived Stock Entries"
+        indexes = [
+            models.Index(fields=["date_added", "id"], name="archivedentry_date_idx"),
+        ]
+
+    __str__ = StockEntry.__str__
+
+
+class SaleHistory(models.Model):
+    """
+    Read-only view over live and archived sales (UNION ALL, see migration
+    0012), for reports whose date range reaches archived months. Query it
+    through inventory.archive.with_archive.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    quantity = models.PositiveIntegerField()
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    cost_price_at_sale = models.DecimalField(max_digits=10, decimal_places=2)
+    date_sold = models.DateTimeField()
+    sold_by = models.ForeignKey(
+        "users.User", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+",
+    )
+    payment_status = models.CharField(max_length=20, choices=Sale.PAYMENT_CHOICES)
+    client_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = "inventory_salehistory"
+        verbose_name_plural = "Sale History"
+
+    __str__ = Sale.__str__
+    total_sale_value = Sale.total_sale_value
+    total_profit = Sale.total_profit
+
+
+class StockEntryHistory(models.Model):
+    """Read-only view over live and archived stock entries, like SaleHistory."""
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    quantity = models.PositiveIntegerField()
+    buying_price = models.DecimalField(max_digits=10, decimal_places=2)
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    date_added = models.DateTimeField()
+    added_by = models.ForeignKey(
+        "users.User", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+",
+    )
+
+    class Meta:
+        managed = False
+        db_table = "inventory_stockentryhistory"
+        verbose_name_plural = "Stock Entry History"
+
+    __str__ = StockEntry.__str__
@@ -0,0 +1,91 @@
+import base64
+
+from datetime import datetime
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(value, pk):
+    """Opaque cursor for a (timestamp, id) position."""
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (timestamp, id) or None if the cursor is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of rows plus cursors for the neighbouring pages."""
+
+    def __init__(self, rows, next_cursor=None, previous_cursor=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def pks(self):
+        return [row.pk for row in self.rows]
+
+
+def keyset_paginate(queryset, field, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Newest-first page of `queryset` keyed on (`field`, id).
+
+    Each page is a single range scan that starts at the cursor, so page N
+    costs the same as page 1 (unlike OFFSET, which re-reads skipped rows).
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before:
+        value, pk = before
+        rows = list(
+            queryset.filter(Q(**{f"{field}__gt": value}) | Q(**{field: value, "pk__gt": pk}))
+            .order_by(field, "pk")[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after:
+            value, pk = after
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+            )
+        rows = list(queryset.order_by(f"-{field}", "-pk")[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None
+
+    if not rows:
+        return KeysetPage(rows)
+
+    first, last = rows[0], rows[-1]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(getattr(last, field), last.pk) if has_next else None,
+        previous_cursor=encode_cursor(getattr(first, field), first.pk) if has_previous else None,
+    )
@@ -0,0 +1,97 @@
+"""
+Pivot reports over the DailySalesSummary rollup.
+
+A report groups sales by any combination of dimensions and returns units,
+revenue, historical cost (the cost snapshotted on each sale), profit and
+margin for every group, every subtotal level and the grand total. Each
+level is one GROUP BY and the levels are glued together with UNION ALL, so
+the whole report is a single SQL query whose rows come back as tuples, in
+display order: every group's detail rows followed by its subtotal.
+"""
+from django.db.models import CharField, DateField, DecimalField, F, FloatField, IntegerField, Sum, Value
+from django.db.models.functions import Cast, NullIf, Round, TruncDay, TruncMonth, TruncWeek
+
+from .models import DailySalesSummary
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+# name: (label, expression over DailySalesSummary). Category is the one
+# stored on the rollup row, as in Category.with_subtree_totals, so sales
+# stay where they were made when a product later moves category.
+DIMENSIONS = {
+    "day": ("Day", TruncDay("day", output_field=DateField())),
+    "week": ("Week", TruncWeek("day", output_field=DateField())),
+    "month": ("Month", TruncMonth("day", output_field=DateField())),
+    "vendor": ("Vendor", F("vendor__username")),
+    "product": ("Product", F("product__name")),
+    "category": ("Category", F("category__full_name")),
+    "payment_status": ("Payment status", F("payment_status")),
+}
+TIME_DIMENSIONS = ("day", "week", "month")
+
+MEASURES = ["units", "revenue", "cost", "profit", "margin"]
+
+
+def _measures():
+    # Aliased apart from the rollup's own field names
+    return {
+        "m_units": Sum("units"),
+        "m_revenue": Sum("revenue", output_field=MONEY),
+        "m_cost": Sum("cost", output_field=MONEY),
+        "m_profit": Sum("profit", output_field=MONEY),
+        # Percent of revenue, in floating point so SQLite doesn't divide
+        # integers; NULL for groups with no revenue
+        "m_margin": Round(
+            Cast(Sum("profit"), FloatField()) * 100.0 / NullIf(Cast(Sum("revenue"), FloatField()), 0.0), 2,
+        ),
+    }
+
+
+def sales_pivot(dimensions, queryset=None):
+    """
+    Group `queryset` (default: the whole rollup) by `dimensions`, a list of
+    DIMENSIONS names, outermost first.
+
+    Returns (columns, rows). Each row is a tuple laid out as `columns`:
+    level, one value per dimension, then MEASURES. `level` is how many
+    dimensions the row is grouped by: len(dimensions) for detail rows,
+    fewer for subtotals (the dimensions it doesn't group by are None) and
+    0 for the grand total, which comes last.
+    """
+    if queryset is None:
+        queryset = DailySalesSummary.objects.all()
+    unknown = set(dimensions) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+
+    names = [f"d_{name}" for name in dimensions]
+    levels = []
+    for level in range(len(dimensions), -1, -1):
+        grouped = {names[i]: DIMENSIONS[dimensions[i]][1] for i in range(level)}
+        # Columns this level doesn't group by, so every level has the same shape
+        padding = {
+            names[i]: Value(None, output_field=_output_field(dimensions[i]))
+            for i in range(level, len(dimensions))
+        }
+        rows = (
+            queryset.order_by()
+            .annotate(level=Value(level, output_field=IntegerField()), **grouped)
+            .values("level", *grouped)
+            .annotate(**padding, **_measures())
+            .values_list("level", *names, *(f"m_{name}" for name in MEASURES))
+        )
+        levels.append(rows)
+
+    combined = levels[0].union(*levels[1:], all=True) if len(levels) > 1 else levels[0]
+    # Groups in order with their subtotals after them: NULLs (the subtotal
+    # padding) sort last, and the deeper level first where NULLs tie
+    ordering = [F(name).asc(nulls_last=True) for name in names] + [F("level").desc()]
+    columns = ["level", *dimensions, *MEASURES]
+    rows = list(combined.order_by(*ordering))
+    if rows and rows[-1][columns.index("units")] is None:
+        rows = []  # only the grand total, over nothing
+    return columns, rows
+
+
+def _output_field(dimension):
+    return DateField() if dimension in TIME_DIMENSIONS else CharField()
@@ -0,0 +1,84 @@
+"""
+Product name search for the autocomplete widget.
+
+On SQLite, names are indexed in an FTS5 table over inventory_product,
+kept in sync by triggers so every write path (Product.save, bulk creates,
+queryset updates, deletes) updates it. Each word typed matches as a word
+prefix ("blu shi" finds "Blue Shirt"); prefixes of up to three characters
+have their own index, longer ones are a range scan of the term index.
+Other databases fall back to one icontains filter per word.
+
+The table and triggers are (re)created after every migrate rather than in
+a migration: SQLite rebuilds a table to alter it, which drops its triggers.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# What the autocomplete shows for each match
+SEARCH_FIELDS = ["id", "name", "selling_price", "buying_price", "quantity"]
+
+FTS_TABLE = "inventory_product_fts"
+
+INSTALL_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, content='inventory_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    # Re-read every name: catches up on writes made while triggers were missing
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def install_search_index(sender, using, **kwargs):
+    """post_migrate handler: create the FTS table and its triggers on SQLite databases."""
+    target = connections[using]
+    if target.vendor != "sqlite" or "inventory_product" not in target.introspection.table_names():
+        return
+    with target.cursor() as cursor:
+        for statement in INSTALL_FTS:
+            cursor.execute(statement)
+
+
+def _words(text):
+    return re.findall(r"\w+", text)
+
+
+def search_products(text, limit=SEARCH_LIMIT):
+    """
+    Products whose name contains every word of `text` as a word prefix,
+    by name, at most `limit` of them; a queryset of SEARCH_FIELDS dicts.
+    """
+    words = _words(text)
+    if not words:
+        return Product.objects.none().values(*SEARCH_FIELDS)
+
+    if connections[Product.objects.db].vendor == "sqlite":
+        # Each word quoted so FTS5 operators typed by the user stay plain text
+        match = " ".join(f'"{word}"*' for word in words)
+        queryset = Product.objects.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+    else:
+        condition = Q()
+        for word in words:
+            condition &= Q(name__icontains=word)
+        queryset = Product.objects.filter(condition)
+    return queryset.order_by("name", "pk").values(*SEARCH_FIELDS)[:limit]
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from .cache import invalidate
+from .models import CatalogDeletion, CatalogVersion, DailySalesSummary, Product, Sale
+
+# Which cached groups each model's writes make stale, keyed by model label
+INVALIDATES = {
+    "inventory.Sale": ("sales",),
+    "inventory.StockEntry": ("stock",),
+    "inventory.Product": ("stock", "catalog"),
+    "inventory.Category": ("catalog",),
+    settings.AUTH_USER_MODEL: ("users",),
+}
+
+
+def invalidate_cached_blocks(sender, **kwargs):
+    invalidate(*INVALIDATES[sender._meta.label])
+
+
+for label in INVALIDATES:
+    post_save.connect(invalidate_cached_blocks, sender=label, dispatch_uid=f"cache-save-{label}")
+    post_delete.connect(invalidate_cached_blocks, sender=label, dispatch_uid=f"cache-delete-{label}")
+
+
+def record_catalog_deletion(sender, instance, **kwargs):
+    # Sent per row for queryset and cascade deletes too, inside their
+    # transaction and before the row goes, so the counter is locked first
+    CatalogDeletion.objects.create(product_id=instance.pk, catalog_version=CatalogVersion.bump())
+
+
+pre_delete.connect(record_catalog_deletion, sender=Product, dispatch_uid="catalog-deletion")
+
+
+def remove_sale_from_rollup(sender, instance, **kwargs):
+    # Sent per row for queryset deletes (e.g. the admin's "Delete selected")
+    # as well as Sale.delete, inside the delete's transaction
+    DailySalesSummary.record(instance, sign=-1)
+
+
+post_delete.connect(remove_sale_from_rollup, sender=Sale, dispatch_uid="sale-rollup-delete")
@@ -1,3 +1,1023 @@
-from django.test import TestCase
+import io
+import json
+import math
+import re
+import threading
+import time
 
-# Create your tests here.
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.replica import ReportingRouter, current_staleness, reading_replica, serving_under
+from core.testing import QueryBudgetMixin
+
+from .management.commands.stress_sales import Command as StressSales, Worker
+from .models import (
+    ArchivedSale, ArchivedStockEntry, Category, DailySalesSummary, Product, ProductForecast, Sale, StockCheckpoint,
+    StockEntry, StockMovement, PATH_STEP,
+)
+from .forecasting import demand_matrix, forecast_catalog
+from .forms import StockEntryForm
+from .intake import bulk_intake
+from .ledger import stock_at, write_checkpoint
+from .pagination import encode_cursor
+from .reporting import sales_pivot
+from users.models import Role, User
+
+# Tables that grow with trading history: filtered reads on them must be
+# served by an index. Catalog tables (products, categories) are small.
+LARGE_TABLES = (
+    "inventory_sale", "inventory_stockentry", "inventory_dailysalessummary",
+    "inventory_archivedsale", "inventory_archivedstockentry",
+)
+# "SCAN t" and "SCAN t USING INDEX i" both read every row; only SEARCH is a lookup
+FULL_SCAN = re.compile(rf"SCAN (?:TABLE )?({'|'.join(LARGE_TABLES)})\b")
+
+
+class InventoryTestCase(TestCase):
+    """Small shop: one admin, two vendors, a few products with stock and sales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Role.objects.create(name="admin", display_name="Admin")
+        vendor_role = Role.objects.create(name="vendor", display_name="Vendor")
+        cls.admin = User.objects.create_user("admin", "admin@example.com", None, role=admin_role)
+        cls.vendor = User.objects.create_user("vendor", "vendor@example.com", None, role=vendor_role)
+        cls.other_vendor = User.objects.create_user("other", "other@example.com", None, role=vendor_role)
+
+        cls.category = Category.objects.create(name="Tops")
+        subcategory = Category.objects.create(name="Shirts", parent=cls.category)
+        cls.products = []
+        for i in range(3):
+            product = Product.objects.create(name=f"Shirt {i}", category=subcategory if i else cls.category)
+            StockEntry(
+                product=product, quantity=100, buying_price=Decimal("100"),
+                selling_price=Decimal("150"), added_by=cls.admin,
+            ).save()
+            cls.products.append(product)
+
+        for i in range(6):
+            Sale(
+                product=Product.objects.get(pk=cls.products[i % 3].pk),
+                quantity=1, selling_price=Decimal("150"),
+                sold_by=cls.vendor if i % 2 else cls.other_vendor,
+                payment_status="Paid" if i % 3 else "Credit",
+            ).save()
+
+    def setUp(self):
+        cache.clear()  # cached dashboard blocks must not leak between tests
+
+
+class CategoryTreeTests(InventoryTestCase):
+    """Materialized paths and full names follow moves and renames of whole subtrees."""
+
+    def setUp(self):
+        super().setUp()
+        self.clothing = Category.objects.create(name="Clothing")
+        self.shoes = Category.objects.create(name="Shoes", parent=self.clothing)
+        self.boots = Category.objects.create(name="Boots", parent=self.shoes)
+        self.sale_rack = Category.objects.create(name="Sale Rack")
+
+    def stored(self, category):
+        return Category.objects.values_list("path", "full_name").get(pk=category.pk)
+
+    def segment(self, category):
+        return f"{category.pk:0{PATH_STEP}d}/"
+
+    def test_move_subtree(self):
+        self.shoes.parent = self.sale_rack
+        self.shoes.save()
+        moved = self.sale_rack.path + self.segment(self.shoes)
+        self.assertEqual(self.stored(self.shoes), (moved, "Sale Rack -> Shoes"))
+        self.assertEqual(self.stored(self.boots), (moved + self.segment(self.boots), "Sale Rack -> Shoes -> Boots"))
+        self.assertEqual(list(self.clothing.descendants()), [self.clothing])
+        self.assertEqual(
+            list(Category.objects.get(pk=self.sale_rack.pk).descendants().order_by("path")),
+            [self.sale_rack, self.shoes, self.boots],
+        )
+
+    def test_rename_rewrites_descendants(self):
+        self.clothing.name = "Apparel"
+        self.clothing.save()
+        self.assertEqual(self.stored(self.shoes)[1], "Apparel -> Shoes")
+        self.assertEqual(self.stored(self.boots), (self.boots.path, "Apparel -> Shoes -> Boots"))
+        self.assertEqual(self.stored(self.sale_rack)[1], "Sale Rack")
+
+    def test_cannot_move_under_own_subtree(self):
+        before = list(Category.objects.order_by("pk").values_list("path", "full_name"))
+        for parent in [self.clothing, self.boots]:
+            with self.subTest(parent.name):
+                self.clothing.parent = parent
+                with self.assertRaisesMessage(ValidationError, "cannot be moved under itself"):
+                    self.clothing.save()
+        self.assertEqual(list(Category.objects.order_by("pk").values_list("path", "full_name")), before)
+
+    def test_subtree_totals(self):
+        shoe = Product.objects.create(name="Sneaker", category=self.shoes, quantity=10, buying_price=Decimal("50"))
+        Product.objects.create(name="Boot", category=self.boots, quantity=4, buying_price=Decimal("100"))
+        Sale(product=shoe, quantity=2, selling_price=Decimal("80"), sold_by=self.vendor).save()
+
+        totals = {
+            category.name: (category.stock_quantity, category.stock_value, category.units_sold, category.revenue)
+            for category in Category.objects.filter(
+                pk__in=[self.clothing.pk, self.shoes.pk, self.boots.pk, self.sale_rack.pk],
+            ).with_subtree_totals()
+        }
+        self.assertEqual(totals, {
+            "Clothing": (12, Decimal("800"), 2, Decimal("160")),
+            "Shoes": (12, Decimal("800"), 2, Decimal("160")),
+            "Boots": (4, Decimal("400"), 0, Decimal("0")),
+            "Sale Rack": (0, Decimal("0"), 0, Decimal("0")),
+        })
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+class QueryPlanTests(InventoryTestCase):
+    """Every filtered query a view issues against a large table must use an index."""
+
+    def assertNoFullScans(self, user, url, data=None):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+
+        scans = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or " WHERE " not in sql:
+                continue  # unfiltered reads of a whole table can't avoid a scan
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans += [f"{detail}: {sql}" for detail in plan if FULL_SCAN.match(detail)]
+        self.assertEqual(scans, [], f"Full table scans for {url} {data or ''}")
+
+    def test_admin_dashboard(self):
+        self.assertNoFullScans(self.admin, reverse("inventory:admin_dashboard"))
+
+    def test_vendor_dashboard(self):
+        self.assertNoFullScans(self.vendor, reverse("inventory:vendor_dashboard"))
+
+    def test_sales_report(self):
+        url = reverse("inventory:sales_report")
+        self.assertNoFullScans(self.admin, url)
+        self.assertNoFullScans(self.admin, url, {"date_from": "2020-01-01", "date_to": "2099-12-31"})
+        self.assertNoFullScans(self.admin, url, {"vendor": self.vendor.pk})
+        self.assertNoFullScans(self.admin, url, {"payment_status": "Credit"})
+        self.assertNoFullScans(self.admin, url, {"category": self.category.pk})
+
+    def test_sales_report_deep_page(self):
+        url = reverse("inventory:sales_report")
+        self.client.force_login(self.admin)
+        cursor = self.client.get(url).context["sales"].rows[2]
+        self.assertNoFullScans(self.admin, url, {"after": encode_cursor(cursor.date_sold, cursor.pk)})
+
+    def test_vendor_sales(self):
+        url = reverse("inventory:vendor_sales")
+        self.assertNoFullScans(self.vendor, url)
+        self.assertNoFullScans(self.vendor, url, {"date_from": "2020-01-01", "payment_status": "Paid"})
+
+    def test_stock_list(self):
+        url = reverse("inventory:stock")
+        self.assertNoFullScans(self.admin, url)
+        self.assertNoFullScans(self.admin, url, {"date_from": "2020-01-01", "date_to": "2099-12-31"})
+
+
+class QueryBudgetTests(QueryBudgetMixin, InventoryTestCase):
+    """Each page stays within its view's @query_budget whatever the data size."""
+
+    def setUp(self):
+        super().setUp()
+        # More rows than the fixture alone, so any per-row query shows up
+        for i in range(5):
+            vendor = User.objects.create_user(f"vendor{i}", f"vendor{i}@example.com", None, role=self.vendor.role)
+            product = Product.objects.create(name=f"Extra {i}", category=self.category)
+            StockEntry(
+                product=product, quantity=10, buying_price=Decimal("100"),
+                selling_price=Decimal("150"), added_by=vendor,
+            ).save()
+            Sale(
+                product=Product.objects.get(pk=product.pk), quantity=1,
+                selling_price=Decimal("150"), sold_by=vendor,
+            ).save()
+
+    def test_admin_pages(self):
+        self.client.force_login(self.admin)
+        for name in [
+            "admin_dashboard", "sales_report", "stock", "stock_intake", "export_sales",
+            "export_stock_entries", "restock_queue", "export_purchase_order", "sales_pivot",
+        ]:
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(f"inventory:{name}"))
+
+    def test_vendor_pages(self):
+        self.client.force_login(self.vendor)
+        for name in ["vendor_dashboard", "vendor_sales", "vendor_checkout", "catalog", "product_search"]:
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(f"inventory:{name}"))
+
+    def test_writes(self):
+        product = self.products[0]
+        sale = {"product": product.pk, "quantity": "1", "selling_price": "150"}
+        basket = {
+            "form-TOTAL_FORMS": "3", "form-INITIAL_FORMS": "0", "payment_status": "Paid",
+            **{f"form-{i}-{field}": value for i in range(3) for field, value in sale.items()},
+        }
+        delivery = io.BytesIO(b"product,quantity,buying_price,selling_price\nShirt 0,5,100,150\nShirt 1,5,100,150\n")
+        delivery.name = "delivery.csv"
+
+        self.client.force_login(self.admin)
+        for name, data in [
+            ("stock", {"add_stock": "", **sale, "buying_price": "100"}),
+            ("stock", {"create_product": "", "name": "Vest", "reorder_level": "5"}),
+            ("stock_intake", {"csv_file": delivery}),
+        ]:
+            with self.subTest(name):
+                response = self.assertWithinQueryBudget(reverse(f"inventory:{name}"), data, method="post")
+                self.assertIn(response.status_code, (200, 302))
+
+        self.client.force_login(self.vendor)
+        for name, data in [("vendor_sales", sale), ("vendor_checkout", basket)]:
+            with self.subTest(name):
+                response = self.assertWithinQueryBudget(reverse(f"inventory:{name}"), data, method="post")
+                self.assertEqual(response.status_code, 302)
+        self.assertEqual(Sale.objects.filter(product=product).count(), 2 + 1 + 3)
+        self.assertEqual(StockEntry.objects.filter(product=product).count(), 3)
+
+    def test_stock_entry_form_checks_product_ids(self):
+        # The form doesn't load the product; the model's ForeignKey check still rejects unknown ids
+        data = {"product": "999999", "quantity": "1", "buying_price": "100", "selling_price": "150"}
+        form = StockEntryForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("product", form.errors)
+
+        form = StockEntryForm({**data, "product": self.products[0].pk})
+        self.assertTrue(form.is_valid(), form.errors)
+        entry = form.save()
+        self.assertEqual(entry.product.name, "Shirt 0")
+
+
+class ProductSearchTests(QueryBudgetMixin, InventoryTestCase):
+    def search(self, q, **params):
+        response = self.assertWithinQueryBudget(reverse("inventory:product_search"), {"q": q, **params})
+        return [row["name"] for row in response.json()["results"]]
+
+    def test_word_prefixes_follow_product_writes(self):
+        self.client.force_login(self.vendor)
+        Product.objects.create(name="Blue Denim Jacket")
+        self.assertEqual(self.search("shi"), ["Shirt 0", "Shirt 1", "Shirt 2"])
+        self.assertEqual(self.search("jack blu"), ["Blue Denim Jacket"])
+        self.assertEqual(self.search('"shirt* ^'), ["Shirt 0", "Shirt 1", "Shirt 2"])
+        self.assertEqual(self.search("shirt", limit="1"), ["Shirt 0"])
+
+        Product.objects.filter(name="Shirt 1").update(name="Polo 1")
+        self.products[2].delete()
+        self.assertEqual(self.search("shirt"), ["Shirt 0"])
+        self.assertEqual(self.search("polo"), ["Polo 1"])
+
+    def test_sale_form_renders_no_options(self):
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse("inventory:vendor_sales"))
+        self.assertNotContains(response, '<select name="product"')
+        self.assertContains(response, "data-product-search")
+        # Available Products is filled in the browser from the synced catalog
+        self.assertContains(response, 'id="available-products"')
+        self.assertContains(response, "js/catalog.js")
+
+    def test_basket_renders_no_options(self):
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse("inventory:vendor_checkout"))
+        self.assertNotContains(response, "<option value=\"%d\"" % self.products[0].pk)
+        self.assertContains(response, "data-product-search", count=5)  # 4 lines and the empty form
+
+    def test_basket_checks_product_ids(self):
+        self.client.force_login(self.vendor)
+        data = {
+            "form-TOTAL_FORMS": "2", "form-INITIAL_FORMS": "0",
+            "form-0-product": self.products[0].pk, "form-0-quantity": "1", "form-0-selling_price": "150",
+            "form-1-product": "999999", "form-1-quantity": "1", "form-1-selling_price": "150",
+            "payment_status": "Paid",
+        }
+        response = self.client.post(reverse("inventory:vendor_checkout"), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["formset"].forms[1].errors["product"], ["Select a valid product."])
+        self.assertEqual(Sale.objects.count(), 6)
+
+        data["form-TOTAL_FORMS"] = "1"
+        response = self.client.post(reverse("inventory:vendor_checkout"), data)
+        self.assertRedirects(response, reverse("inventory:vendor_sales"), fetch_redirect_response=False)
+        self.assertEqual(Sale.objects.count(), 7)
+
+
+class SalesRollupTests(InventoryTestCase):
+    """DailySalesSummary follows every way a sale is written or removed."""
+
+    def rollup(self, product):
+        return {
+            row.payment_status: (row.sales_count, row.units, row.revenue)
+            # Rows emptied by a removal stay behind at zero
+            for row in DailySalesSummary.objects.filter(product=product, vendor=self.vendor).exclude(sales_count=0)
+        }
+
+    def sell(self, product, quantity, payment_status="Paid"):
+        sale = Sale(
+            product=Product.objects.get(pk=product.pk), quantity=quantity,
+            selling_price=Decimal("150"), sold_by=self.vendor, payment_status=payment_status,
+        )
+        sale.save()
+        return sale
+
+    def test_save_and_edit(self):
+        product = self.products[0]
+        before = self.rollup(product)
+        self.assertEqual(before, {"Credit": (1, 1, 150)})
+        sale = self.sell(product, 6)
+        self.assertEqual(self.rollup(product), {**before, "Paid": (1, 6, 900)})
+
+        sale.payment_status = "Credit"
+        sale.save()
+        self.assertEqual(self.rollup(product), {"Credit": (2, 7, 1050)})
+
+    def test_instance_delete(self):
+        product = self.products[0]
+        before = self.rollup(product)
+        self.sell(product, 6).delete()
+        self.assertEqual(self.rollup(product), before)
+
+    def test_queryset_delete(self):
+        product = self.products[0]
+        before = self.rollup(product)
+        sales = [self.sell(product, 6), self.sell(product, 2, "Credit")]
+        Sale.objects.filter(pk__in=[sale.pk for sale in sales]).delete()
+        self.assertEqual(self.rollup(product), before)
+
+    def test_product_delete_cascades_cleanly(self):
+        product = self.products[0]
+        product.delete()
+        self.assertFalse(DailySalesSummary.objects.filter(product_id=product.pk).exists())
+
+
+class CheckoutTests(InventoryTestCase):
+    """A basket is recorded all or nothing, in a fixed number of queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.basket = []
+        for i in range(4):
+            product = Product.objects.create(name=f"Basket {i}")
+            StockEntry(
+                product=product, quantity=10, buying_price=Decimal("100"), selling_price=Decimal("150"),
+            ).save()
+            self.basket.append(product)
+
+    def line(self, product, quantity=1):
+        return {"product": product.pk, "quantity": quantity, "selling_price": Decimal("150")}
+
+    def state(self):
+        return (
+            list(Product.objects.order_by("pk").values_list("quantity", "below_reorder", "catalog_version")),
+            Sale.objects.count(),
+            list(DailySalesSummary.objects.order_by("pk").values_list("units", "revenue")),
+            StockMovement.objects.count(),
+        )
+
+    def test_bad_line_rolls_back_basket(self):
+        before = self.state()
+        with self.assertRaisesMessage(ValidationError, "Not enough stock for Basket 2"):
+            # The second line of Basket 0 passes alone but not after the first
+            Sale.checkout([
+                self.line(self.basket[0], 6), self.line(self.basket[1]),
+                self.line(self.basket[2], 11), self.line(self.basket[0], 5),
+            ], sold_by=self.vendor)
+        self.assertEqual(self.state(), before)
+
+        with self.assertRaisesMessage(ValidationError, "Not enough stock for Basket 0. Available: 4, Requested: 5"):
+            Sale.checkout([self.line(self.basket[0], 6), self.line(self.basket[0], 5)], sold_by=self.vendor)
+        self.assertEqual(self.state(), before)
+
+        # A failure after the sales, stock and ledger are written undoes them too
+        with mock.patch.object(DailySalesSummary, "record_many", side_effect=IntegrityError), \
+                self.assertRaises(IntegrityError):
+            Sale.checkout([self.line(product) for product in self.basket], sold_by=self.vendor)
+        self.assertEqual(self.state(), before)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        # Lock, insert, stock update, ledger insert, rollup read and insert,
+        # plus the version bump and the savepoint pair
+        with self.assertNumQueries(9):
+            Sale.checkout([self.line(self.basket[0])], sold_by=self.vendor)
+        with self.assertNumQueries(9):
+            Sale.checkout([self.line(product) for product in self.basket[1:]], sold_by=self.vendor)
+        self.assertEqual(Sale.objects.filter(product__in=self.basket).count(), 4)
+        self.assertEqual(Product.objects.get(pk=self.basket[3].pk).quantity, 9)
+
+
+class SaleSyncTests(InventoryTestCase):
+    """Offline POS batches: retries and repeated keys never apply a sale twice."""
+
+    def sync(self, *lines, client=None, **extra):
+        return (client or self.client).post(
+            reverse("inventory:sync_sales"), json.dumps({"sales": list(lines)}),
+            content_type="application/json", **extra,
+        )
+
+    def line(self, key, product, quantity=1, price="150"):
+        return {"key": key, "product": product.pk, "quantity": quantity, "selling_price": price}
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.vendor)
+        self.product = self.products[0]
+        self.stock = Product.objects.get(pk=self.product.pk).quantity
+
+    def assertStock(self, sold):
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, self.stock - sold)
+
+    def test_retried_batch_applies_once(self):
+        batch = [self.line("pos-1", self.product, 2), self.line("pos-2", self.product, 3)]
+        first = self.sync(*batch).json()
+        self.assertEqual((first["created"], first["duplicates"]), (2, 0))
+
+        retry = self.sync(*batch).json()
+        self.assertEqual((retry["created"], retry["duplicates"]), (0, 2))
+        self.assertEqual([r["sale"] for r in retry["results"]], [r["sale"] for r in first["results"]])
+        self.assertEqual(Sale.objects.filter(client_key__in=["pos-1", "pos-2"]).count(), 2)
+        self.assertStock(5)
+
+    def test_key_repeated_within_batch(self):
+        results = self.sync(self.line("pos-1", self.product, 2), self.line("pos-1", self.product, 2)).json()
+        created, duplicate = results["results"]
+        self.assertEqual((created["status"], duplicate["status"]), ("created", "duplicate"))
+        self.assertEqual(duplicate["sale"], created["sale"])
+        self.assertStock(2)
+
+    def test_accepted_and_rejected_lines(self):
+        results = self.sync(
+            self.line("pos-1", self.product, 2),
+            self.line("pos-2", self.product, self.stock),  # more than is left after pos-1
+            self.line("pos-3", self.product, 1, price="1"),  # below cost
+            {"key": "pos-4", "product": self.product.pk},  # no quantity or price
+            self.line("pos-5", self.product, 1),
+        ).json()
+        self.assertEqual(
+            [r["status"] for r in results["results"]],
+            ["created", "rejected", "rejected", "rejected", "created"],
+        )
+        self.assertEqual((results["created"], results["rejected"]), (2, 3))
+        self.assertIn("Not enough stock", results["results"][1]["errors"][0])
+        self.assertStock(3)
+
+        # Rejected lines can be fixed and resent under the same key
+        retry = self.sync(self.line("pos-1", self.product, 2), self.line("pos-2", self.product, 1)).json()
+        self.assertEqual([r["status"] for r in retry["results"]], ["duplicate", "created"])
+        self.assertStock(4)
+
+    def test_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.vendor)
+        self.assertEqual(self.sync(self.line("pos-1", self.product), client=client).status_code, 403)
+
+        client.get(reverse("users:login"))  # sets the csrftoken cookie
+        token = client.cookies[settings.CSRF_COOKIE_NAME].value
+        response = self.sync(self.line("pos-1", self.product), client=client, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertStock(1)
+
+
+class RestockStateTests(InventoryTestCase):
+    """below_reorder, shortfall and went_low_at follow quantity around reorder_level."""
+
+    def test_transitions(self):
+        product = Product.objects.create(name="Restock", reorder_level=5, quantity=6)
+        self.assertEqual((product.below_reorder, product.shortfall, product.went_low_at), (False, 0, None))
+
+        product.quantity = 5  # at the level counts as low
+        product.save()
+        went_low_at = product.went_low_at
+        self.assertEqual((product.below_reorder, product.shortfall), (True, 1))
+        self.assertIsNotNone(went_low_at)
+
+        product.quantity = 0  # lower still: same alert, bigger shortfall
+        product.save()
+        self.assertEqual((product.below_reorder, product.shortfall, product.went_low_at), (True, 6, went_low_at))
+
+        product.quantity = 6  # back above: cleared
+        product.save()
+        self.assertEqual((product.below_reorder, product.shortfall, product.went_low_at), (False, 0, None))
+
+        product.reorder_level = 6  # the level moving up to the quantity flags it again
+        product.save()
+        self.assertEqual((product.below_reorder, product.shortfall), (True, 1))
+        self.assertIsNotNone(product.went_low_at)
+
+        stored = Product.objects.get(pk=product.pk)
+        self.assertEqual(
+            (stored.below_reorder, stored.shortfall, stored.went_low_at),
+            (product.below_reorder, product.shortfall, product.went_low_at),
+        )
+
+    def test_queryset_updates(self):
+        product = Product.objects.create(name="Restock", reorder_level=5, quantity=6)
+        products = Product.objects.filter(pk=product.pk)
+        state = lambda: products.values_list("below_reorder", "shortfall", "went_low_at").get()
+
+        products.update(quantity=F("quantity") - 1)
+        below_reorder, shortfall, went_low_at = state()
+        self.assertEqual((below_reorder, shortfall), (True, 1))
+        self.assertIsNotNone(went_low_at)
+
+        products.update(quantity=0)
+        self.assertEqual(state(), (True, 6, went_low_at))
+
+        products.update(reorder_level=0, name="Restocked")  # the shortfall follows the level
+        self.assertEqual(state(), (True, 1, went_low_at))
+        products.update(quantity=1)
+        self.assertEqual(state(), (False, 0, None))
+
+        products.update(name="Renamed")  # unrelated columns leave the state alone
+        self.assertEqual(state(), (False, 0, None))
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+    def test_low_stock_reads_use_the_restock_index(self):
+        # It replaced 0004's product_qty_reorder_idx and product_needs_restock_idx
+        for queryset in [
+            Product.objects.filter(below_reorder=True).order_by("-went_low_at", "-id"),
+            Product.objects.filter(below_reorder=True).values("pk"),
+        ]:
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+            self.assertIn("product_restock_queue_idx", plan)
+
+    def test_queue_lists_flagged_products_only(self):
+        low = Product.objects.create(name="Low", reorder_level=5, quantity=2)
+        Product.objects.create(name="Plenty", reorder_level=5, quantity=50)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("inventory:restock_queue"))
+        names = [product.name for product in response.context["products"]]
+        self.assertEqual(names[0], "Low")  # newest alert first
+        self.assertNotIn("Plenty", names)
+        self.assertEqual(set(names) - {"Low"}, set(
+            Product.objects.filter(below_reorder=True).exclude(pk=low.pk).values_list("name", flat=True)
+        ))
+
+
+class DashboardCacheTests(InventoryTestCase):
+    """Every kind of product write shows on the next dashboard render, however the blocks were cached."""
+
+    def total_stock(self):
+        return self.client.get(reverse("inventory:admin_dashboard")).context["total_stock"]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.product = Product.objects.get(pk=self.products[0].pk)
+        self.total = self.total_stock()
+
+    def test_save(self):
+        self.product.quantity += 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.total_stock(), self.total + 5)
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.total_stock(), self.total - self.product.quantity)
+
+    def test_queryset_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(quantity=F("quantity") + 7)
+        self.assertEqual(self.total_stock(), self.total + 7)
+
+
+class SaleStockTests(InventoryTestCase):
+    """Sale.save takes stock off with one conditional UPDATE ... RETURNING."""
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Boundary", reorder_level=5)
+        StockEntry(
+            product=self.product, quantity=10, buying_price=Decimal("100"), selling_price=Decimal("150"),
+        ).save()
+
+    def sell(self, quantity, price="150"):
+        sale = Sale(product=Product.objects.get(pk=self.product.pk), quantity=quantity, selling_price=Decimal(price))
+        sale.save()
+        return sale
+
+    def restock_state(self):
+        return Product.objects.values_list("quantity", "below_reorder", "shortfall", "went_low_at").get(
+            pk=self.product.pk,
+        )
+
+    def test_rejected_sales_change_nothing(self):
+        before = self.restock_state()
+        with self.assertRaisesMessage(ValidationError, "Not enough stock for Boundary. Available: 10, Requested: 11"):
+            self.sell(11)
+        with self.assertRaisesMessage(ValidationError, "cannot be lower than current cost price (100.00)"):
+            self.sell(1, price="99.99")
+        self.assertEqual(self.restock_state(), before)
+        self.assertFalse(Sale.objects.filter(product=self.product).exists())
+
+    def test_returns_quantity_and_cost_snapshot(self):
+        StockEntry(product=self.product, quantity=10, buying_price=Decimal("121"), selling_price=Decimal("150")).save()
+        sale = self.sell(4)
+        stored = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(sale.cost_price_at_sale, Decimal("120"))  # the blended cost, rounded up to 10
+        self.assertEqual(Sale.objects.get(pk=sale.pk).cost_price_at_sale, stored.buying_price)
+        for field in ["quantity", "buying_price", "below_reorder", "shortfall", "went_low_at", "catalog_version"]:
+            self.assertEqual(getattr(sale.product, field), getattr(stored, field), field)
+        self.assertEqual(stored.quantity, 16)
+
+    def test_restock_state_at_reorder_level(self):
+        self.sell(4)  # 6 left: one above the reorder level
+        self.assertEqual(self.restock_state(), (6, False, 0, None))
+
+        self.sell(1)  # 5: at the level counts as low
+        quantity, low, shortfall, went_low_at = self.restock_state()
+        self.assertEqual((quantity, low, shortfall), (5, True, 1))
+        self.assertIsNotNone(went_low_at)
+
+        self.sell(1)  # still low: the alert keeps its original time
+        self.assertEqual(self.restock_state(), (4, True, 2, went_low_at))
+
+        # Matches what Product.save would compute for the same quantity
+        product = Product.objects.get(pk=self.product.pk)
+        product.refresh_restock_state()
+        self.assertEqual((product.below_reorder, product.shortfall, product.went_low_at), (True, 2, went_low_at))
+
+
+class LedgerTests(InventoryTestCase):
+    """Point-in-time stock from the movement ledger, starting at the latest checkpoint."""
+
+    def test_admin_is_read_only(self):
+        superuser = User.objects.create_user(
+            "root", "root@example.com", None, role=self.admin.role, is_staff=True, is_superuser=True,
+        )
+        self.client.force_login(superuser)
+        movement = StockMovement.objects.first()
+        self.assertEqual(self.client.get(reverse("admin:inventory_stockmovement_changelist")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("admin:inventory_stockmovement_add")).status_code, 403)
+        response = self.client.post(reverse("admin:inventory_stockmovement_change", args=[movement.pk]), {})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(reverse("admin:inventory_stockmovement_delete", args=[movement.pk]), {"post": "yes"})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(StockMovement.objects.filter(pk=movement.pk).exists())
+
+    def test_replay_around_checkpoint(self):
+        now = timezone.now()
+        product = Product.objects.create(name="Ledger")
+        earlier, checkpoint = now - timedelta(days=2), now - timedelta(days=1)
+
+        def moved(when, write):
+            write()
+            StockMovement.objects.filter(product=product, occurred_at__gte=now).update(occurred_at=when)
+
+        def sell(quantity):
+            Sale(product=Product.objects.get(pk=product.pk), quantity=quantity, selling_price=Decimal("150")).save()
+
+        moved(earlier, lambda: StockEntry(
+            product=product, quantity=10, buying_price=Decimal("100"), selling_price=Decimal("150"),
+        ).save())
+        moved(earlier, lambda: sell(3))
+        moved(checkpoint, lambda: sell(2))  # at the checkpoint: after it, moments are exclusive
+        self.assertEqual(write_checkpoint(checkpoint), 1)  # the fixture's products moved later
+        sell(1)
+
+        self.assertNotIn(product.pk, stock_at(earlier))
+        self.assertEqual(stock_at(checkpoint)[product.pk], (7, Decimal("100")))
+        self.assertEqual(StockCheckpoint.objects.get(product=product, as_of=checkpoint).quantity, 7)
+        self.assertEqual(stock_at(checkpoint + timedelta(microseconds=1))[product.pk][0], 5)
+
+        # Reads after the checkpoint replay only what follows it
+        StockMovement.objects.filter(occurred_at__lt=checkpoint).delete()
+        current = {p.pk: (p.quantity, p.buying_price) for p in Product.objects.all()}
+        self.assertEqual(stock_at(now + timedelta(seconds=1)), current)
+        self.assertEqual(current[product.pk], (4, Decimal("100")))
+
+
+class ForecastTests(InventoryTestCase):
+    """forecast_catalog on a short fixed history, checked against hand-computed numbers."""
+
+    def setUp(self):
+        super().setUp()
+        # A year out, so the fixture's sales fall outside the history
+        self.today = timezone.localdate() + timedelta(days=365)
+        self.selling = Product.objects.create(name="Selling", quantity=3)
+        self.idle = Product.objects.create(name="Idle", quantity=3)
+        # Oldest first: 0, 2, 0, 4 units, the last day split over two payment statuses
+        for days_ago, units, status in [(2, 2, "Paid"), (0, 3, "Paid"), (0, 1, "Credit")]:
+            DailySalesSummary.objects.create(
+                day=self.today - timedelta(days=days_ago), product=self.selling,
+                payment_status=status, sales_count=1, units=units,
+            )
+
+    def forecast(self):
+        forecast = forecast_catalog(
+            today=self.today, history_days=4, window_days=2, alpha=0.5, lead_time_days=1, cover_days=1,
+        )
+        rows = list(forecast["product_id"])
+        return {
+            product.pk: {name: values[rows.index(product.pk)] for name, values in forecast.items()}
+            for product in [self.selling, self.idle]
+        }
+
+    def test_known_history(self):
+        forecast = self.forecast()
+        selling = forecast[self.selling.pk]
+        self.assertAlmostEqual(selling["moving_average"], 2.0)  # (0 + 4) / 2
+        # Weights 1, 1/2, 1/4, 1/8 newest first: (4 + 0 + 1 + 0) / 1.875
+        self.assertAlmostEqual(selling["smoothed_velocity"], 2.4)
+        self.assertAlmostEqual(selling["days_of_cover"], 1.25)
+        self.assertEqual(selling["reorder_quantity"], 2)  # ceil(2.4 * 2) - 3
+
+        idle = forecast[self.idle.pk]
+        self.assertEqual((idle["moving_average"], idle["smoothed_velocity"]), (0, 0))
+        self.assertTrue(math.isnan(idle["days_of_cover"]))
+        self.assertEqual(idle["reorder_quantity"], 0)
+
+    def test_rollup_rows_of_unlisted_products_are_dropped(self):
+        first_day = self.today - timedelta(days=3)
+        matrix = demand_matrix(np.array([self.idle.pk]), first_day, 4)
+        self.assertEqual(matrix.tolist(), [[0, 0, 0, 0]])
+
+        matrix = demand_matrix(np.array([self.selling.pk - 1, self.selling.pk]), first_day, 4)
+        self.assertEqual(matrix.tolist(), [[0, 0, 0, 0], [0, 2, 0, 4]])
+
+    def test_command_stores_forecasts(self):
+        with mock.patch("inventory.forecasting.timezone.localdate", return_value=self.today):
+            call_command("forecast", history=4, window=2, alpha=0.5, lead_time=1, cover_days=1, stdout=io.StringIO())
+        stored = ProductForecast.objects.get(product=self.selling)
+        self.assertEqual(stored.reorder_quantity, 2)
+        self.assertEqual(ProductForecast.objects.count(), Product.objects.count())
+
+
+class CatalogTests(InventoryTestCase):
+    """The versioned catalog: ETag revalidation, ?since= deltas and deletion tombstones."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.vendor)
+
+    def fetch(self, since=None, etag=None):
+        params = {"since": since} if since is not None else {}
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(reverse("inventory:catalog"), params, **headers)
+
+    def test_full_then_not_modified(self):
+        response = self.fetch()
+        body = response.json()
+        self.assertTrue(body["full"])
+        self.assertEqual({p["id"] for p in body["products"]}, {p.pk for p in self.products})
+        self.assertEqual(response["ETag"], f'"catalog-{body["version"]}"')
+
+        self.assertEqual(self.fetch(since=body["version"], etag=response["ETag"]).status_code, 304)
+
+    def test_delta_and_tombstones(self):
+        first = self.fetch().json()
+        changed, deleted = self.products[0], self.products[1]
+        changed.name = "Renamed"
+        changed.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        response = self.fetch(since=first["version"], etag=f'"catalog-{first["version"]}"')
+        self.assertEqual(response.status_code, 200)
+        delta = response.json()
+        self.assertFalse(delta["full"])
+        self.assertEqual([p["name"] for p in delta["products"]], ["Renamed"])
+        self.assertEqual(delta["deleted"], [deleted_pk])
+
+        # A version this database never handed out: start over
+        self.assertTrue(self.fetch(since=delta["version"] + 100).json()["full"])
+
+    def test_queryset_updates_bump_version(self):
+        first = self.fetch().json()
+        Product.objects.filter(pk=self.products[2].pk).update(selling_price=Decimal("175"))
+
+        response = self.fetch(since=first["version"], etag=f'"catalog-{first["version"]}"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(p["id"], p["selling_price"]) for p in response.json()["products"]],
+            [(self.products[2].pk, "175.00")],
+        )
+
+
+class PivotTests(InventoryTestCase):
+    def test_subtotals_follow_their_groups(self):
+        columns, rows = sales_pivot(["payment_status", "vendor"])
+        self.assertEqual(columns, ["level", "payment_status", "vendor", "units", "revenue", "cost", "profit", "margin"])
+        self.assertEqual(
+            [row[:4] for row in rows],
+            [
+                (2, "Credit", "other", 1), (2, "Credit", "vendor", 1), (1, "Credit", None, 2),
+                (2, "Paid", "other", 2), (2, "Paid", "vendor", 2), (1, "Paid", None, 4),
+                (0, None, None, 6),
+            ],
+        )
+        self.assertEqual(rows[-1][4:], (Decimal("900"), Decimal("600"), Decimal("300"), 33.33))
+        for level in (1, 0):
+            self.assertEqual(
+                sum(row[4] for row in rows if row[0] == 2),
+                sum(row[4] for row in rows if row[0] == level),
+            )
+
+    def test_category_agrees_with_subtree_totals_after_move(self):
+        # Shirt 1 sold under "Tops -> Shirts", then moved up to "Tops"
+        Product.objects.filter(pk=self.products[1].pk).update(category=self.category)
+
+        _, rows = sales_pivot(["category"])
+        by_category = {row[1]: row[3] for row in rows if row[0] == 1}  # category: revenue
+        totals = {c.full_name: c.revenue for c in Category.objects.with_subtree_totals()}
+        self.assertEqual(by_category, {"Tops": Decimal("300"), "Tops -> Shirts": Decimal("600")})
+        self.assertEqual(totals["Tops -> Shirts"], by_category["Tops -> Shirts"])
+        self.assertEqual(totals["Tops"], sum(by_category.values()))
+
+    def test_empty_selection(self):
+        self.assertEqual(sales_pivot(["day"], DailySalesSummary.objects.none())[1], [])
+
+
+class StockEntryTests(InventoryTestCase):
+    def test_intake_ignores_stale_product_instance(self):
+        product = self.products[0]
+        stale = Product.objects.get(pk=product.pk)
+        # Another request sells and restocks after `stale` was read
+        Sale(product=Product.objects.get(pk=product.pk), quantity=5, selling_price=Decimal("150")).save()
+        StockEntry(
+            product=Product.objects.get(pk=product.pk), quantity=10,
+            buying_price=Decimal("200"), selling_price=Decimal("250"),
+        ).save()
+
+        current = Product.objects.get(pk=product.pk)
+        expected = StockEntry.weighted_prices(
+            current.quantity, current.buying_price, current.selling_price,
+            10, Decimal("100"), Decimal("150"),
+        )
+
+        entry = StockEntry(product=stale, quantity=10, buying_price=Decimal("100"), selling_price=Decimal("150"))
+        entry.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, expected[0])
+        self.assertEqual(product.buying_price, expected[1])
+        self.assertEqual(entry.product.quantity, product.quantity)
+
+    def test_bulk_intake_matches_single_saves(self):
+        # (quantity, buying price, selling price) per delivery line, per product
+        deliveries = [
+            [(2, "95.50", "140"), (3, "101", "155.55"), (1, "130", "170")],  # low, still low, then above
+            [(1, "80", "120")],  # stays low
+            [(20, "33.33", "49.99"), (7, "41", "60")],
+        ]
+        bulk, single = [], []
+        for i in range(len(deliveries)):
+            for products in (bulk, single):
+                products.append(Product.objects.create(name=f"Delivery {i} {len(products)}", reorder_level=5))
+
+        lines = [
+            {"line": n, "product": str(product.pk), "quantity": quantity,
+             "buying_price": Decimal(cost), "selling_price": Decimal(sell)}
+            for product, delivery in zip(bulk, deliveries)
+            for n, (quantity, cost, sell) in enumerate(delivery, start=2)
+        ]
+        self.assertEqual([row["quantity_after"] for row in bulk_intake(lines, dry_run=True)], [6, 1, 27])
+        self.assertFalse(StockEntry.objects.filter(product__in=bulk).exists())
+        bulk_intake(lines)
+
+        for product, delivery in zip(single, deliveries):
+            for quantity, cost, sell in delivery:
+                StockEntry(
+                    product=product, quantity=quantity,
+                    buying_price=Decimal(cost), selling_price=Decimal(sell),
+                ).save()
+
+        def state(product):
+            product.refresh_from_db()
+            return (
+                product.quantity, product.buying_price, product.selling_price,
+                product.below_reorder, product.shortfall, product.went_low_at is None,
+            )
+
+        for bulk_product, single_product in zip(bulk, single):
+            self.assertEqual(state(bulk_product), state(single_product))
+        self.assertEqual([state(product)[3:] for product in bulk], [(False, 0, True), (True, 5, False), (False, 0, True)])
+
+
+class ConcurrentStockTests(TransactionTestCase):
+    """Parallel restocks and sales on one product must not lose updates."""
+
+    def test_parallel_intakes_and_sales_balance(self):
+        options = {
+            "threads": 6, "ops": 40, "restock_ratio": 0.5, "products": 1, "initial_stock": 100,
+            "retries": 50, "backoff": 0.005, "seed": 7,
+        }
+        product_ids, vendor = StressSales().seed(options)
+
+        barrier = threading.Barrier(options["threads"])
+        workers = [Worker(i, product_ids, vendor, options, barrier) for i in range(options["threads"])]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report = StressSales().report(workers, time.perf_counter() - started, product_ids, options)
+
+        self.assertEqual(report["failures"], 0, report["sample_errors"])
+        self.assertGreater(report["restocks"], 0)
+        self.assertTrue(report["consistent"], report["products"])
+
+
+class ReportingRouterTests(TransactionTestCase):
+    """Replica reads only for inventory models, and never inside a transaction."""
+
+    def test_routing(self):
+        router = ReportingRouter()
+        self.assertEqual(router.db_for_read(Sale), "default")
+
+        with serving_under(60):
+            self.assertEqual(router.db_for_read(Sale), "reporting")
+            self.assertEqual(router.db_for_read(User), "default")
+            self.assertEqual(router.db_for_write(Sale), "default")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Product), "default")
+
+    def test_missing_snapshot_reads_primary(self):
+        with reading_replica(60):
+            self.assertIsNone(current_staleness())
+
+
+class ArchiveTests(InventoryTestCase):
+    """archive_sales moves closed months out of the live tables without changing what reports show."""
+
+    def setUp(self):
+        super().setUp()
+        self.old = timezone.make_aware(datetime(2024, 3, 15, 12))
+        self.old_sales = list(Sale.objects.order_by("id").values_list("id", flat=True)[:4])
+        Sale.objects.filter(pk__in=self.old_sales).update(date_sold=self.old)
+        StockEntry.objects.update(date_added=self.old)
+
+    def test_archive_moves_rows_and_keeps_rollups(self):
+        rollup = list(DailySalesSummary.objects.order_by("id").values_list("units", "revenue"))
+
+        call_command("archive_sales", "--before", "2024-04", "--chunk-size", "3", stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(set(ArchivedSale.objects.values_list("id", flat=True)), set(self.old_sales))
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertEqual(ArchivedStockEntry.objects.count(), 3)
+        self.assertFalse(StockEntry.objects.exists())
+        self.assertEqual(list(DailySalesSummary.objects.order_by("id").values_list("units", "revenue")), rollup)
+        # Nothing left to move: a rerun is a no-op
+        call_command("archive_sales", "--before", "2024-04", stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(ArchivedSale.objects.count(), 4)
+
+    def test_rebuilds_include_archived_rows(self):
+        def totals():
+            return sorted(
+                DailySalesSummary.objects.values("product", "vendor", "payment_status")
+                .annotate(units=Sum("units"), revenue=Sum("revenue"))
+                .values_list("product", "vendor", "payment_status", "units", "revenue")
+            )
+
+        before = totals()
+        call_command("archive_sales", "--before", "2024-04", stdout=io.StringIO(), stderr=io.StringIO())
+
+        call_command("rebuild_sales_summary", stdout=io.StringIO())
+        self.assertEqual(totals(), before)
+
+        call_command("backfill_ledger", stdout=io.StringIO())
+        movements = StockMovement.objects.all()
+        self.assertFalse(movements.filter(kind=StockMovement.ADJUSTMENT).exists())
+        self.assertEqual(movements.filter(kind=StockMovement.INTAKE, stock_entry__isnull=True).count(), 3)
+        self.assertEqual(movements.filter(kind=StockMovement.SALE, sale__isnull=True).count(), 4)
+        self.assertEqual(movements.filter(kind=StockMovement.SALE, sale__isnull=False).count(), 2)
+
+    def test_reports_read_archive_only_when_range_needs_it(self):
+        call_command("archive_sales", "--before", "2024-04", stdout=io.StringIO(), stderr=io.StringIO())
+        self.client.force_login(self.admin)
+
+        recent = self.client.get(reverse("inventory:sales_report"), {"date_from": "2024-04-01"})
+        self.assertEqual(len(recent.context["sales"]), 2)
+        self.assertIs(recent.context["sales"].rows[0].__class__, Sale)
+
+        everything = self.client.get(reverse("inventory:sales_report"))
+        self.assertEqual(len(everything.context["sales"]), 6)
+        self.assertEqual(everything.context["grand_totals"]["units"], 6)
+
+        export = self.client.get(reverse("inventory:export_stock_entries"), {"date_to": "2024-03-31"})
+        self.assertEqual(len(b"".join(export.streaming_content).decode().splitlines()), 4)
@@ -7,9 +7,20 @@ urlpatterns = [
     # Admin Urls
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('sales_report/', views.sales_report, name='sales_report'),
+    path('sales_report/export/', views.export_sales, name='export_sales'),
+    path('sales_report/pivot/', views.sales_pivot, name='sales_pivot'),
     path('stock/', views.stock_list, name='stock'),
+    path('stock/intake/', views.stock_intake, name='stock_intake'),
+    path('stock/export/', views.export_stock_entries, name='export_stock_entries'),
+    path('stock/restock/', views.restock_queue, name='restock_queue'),
+    path('stock/restock/purchase_order/', views.export_purchase_order, name='export_purchase_order'),
+    path('cache/stats/', views.cache_statistics, name='cache_stats'),
     
     # Vendor urls
     path('dashboard/', views.vendor_dashboard, name='vendor_dashboard'),
-    path('sales/', views.vendor_sales, name='vendor_sales')
+    path('sales/', views.vendor_sales, name='vendor_sales'),
+    path('sales/checkout/', views.vendor_checkout, name='vendor_checkout'),
+    path('api/sales/sync/', views.sync_sales, name='sync_sales'),
+    path('api/catalog/', views.catalog, name='catalog'),
+    path('api/products/search/', views.product_search, name='product_search'),
 ]
\ No newline at end of file
@@ -1,59 +1,128 @@
+import asyncio
 import json
 
+from collections import Counter
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import F, ExpressionWrapper, DecimalField, Sum
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Count, F, ExpressionWrapper, DecimalField, Sum
+from django.db.models.functions import TruncMonth
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.utils.timezone import now
-from datetime import timedelta
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.timezone import localdate
+from django.views.decorators.http import require_GET, require_POST
+from datetime import date, timedelta
+
+from .models import CatalogDeletion, CatalogVersion, Category, DailySalesSummary, Product, Sale, StockEntry
+from .forms import (
+    ProductForm, StockEntryForm, SaleForm, SaleFilterForm, StockEntryFilterForm,
+    BasketFormSet, CheckoutForm, StockIntakeForm, SaleSyncLineForm, SalesPivotForm,
+)
+from .archive import with_archive
+from .cache import acached_block, stats as cache_stats
+from .exports import export_purchase_order_csv, export_sales_csv, export_stock_entries_csv
+from .intake import bulk_intake, parse_intake_csv
+from .pagination import keyset_paginate
+from .reporting import DIMENSIONS, sales_pivot as build_sales_pivot
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, search_products
+
+from core.decorators import query_budget, reads_from_replica
+from users.models import User
 
-from .models import Product, Sale, StockEntry
-from .forms import ProductForm, StockEntryForm, SaleForm
 
-from users.models import User
+SALE_VALUE = ExpressionWrapper(
+    F("quantity") * F("selling_price"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
 
 
 # Create your views here
+def _sales_totals(queryset):
+    totals = queryset.order_by().aggregate(units=Sum("quantity"), revenue=Sum(SALE_VALUE))
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def _csv_response(lines, name):
+    response = StreamingHttpResponse(lines, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{name}-{localdate():%Y%m%d}.csv"'
+    return response
+
+
+def _month_starts(today, count):
+    """First day of each of the last `count` months, oldest first."""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
 @login_required
-def admin_dashboard(request):
-    today = now().date()
+@query_budget(9)
+@reads_from_replica(max_staleness=60)
+async def admin_dashboard(request):
+    # Share the user login_required already loaded with the template
+    request.user = await request.auser()
+    today = localdate()
+    last_6_months = _month_starts(today, 6)
 
     # Total stock (sum of quantities)
-    total_stock = Product.objects.aggregate(total=Sum("quantity"))["total"] or 0
+    async def total_stock():
+        return (await Product.objects.aaggregate(total=Sum("quantity")))["total"] or 0
 
     # Sales today
-    sales_today = Sale.objects.filter(date_sold__date=today).count()
-
-    # Low stock alerts (e.g., below 5 units)
-    low_stock_count = Product.objects.filter(quantity__lt=5).count()
-
-    # Shopkeepers (users who sold something or all users except admin?)
-    shopkeepers_count = User.objects.filter(is_staff=False).count()
+    async def sales_today():
+        totals = await DailySalesSummary.objects.filter(day=today).aaggregate(total=Sum("sales_count"))
+        return totals["total"] or 0
 
     # Sales trend (last 6 months)
-    last_6_months = [(today.replace(day=1) - timedelta(days=30*i)) for i in range(5, -1, -1)]
+    async def monthly_sales():
+        return {
+            month: total
+            async for month, total in DailySalesSummary.objects.filter(day__gte=last_6_months[0])
+            .annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(total=Sum("revenue"))
+            .values_list("month", "total")
+        }
+
+    # Stock distribution: each top-level category with its whole subtree rolled up
+    async def stock_distribution():
+        return [
+            row
+            async for row in Category.objects.filter(parent=None)
+            .with_subtree_totals()
+            .order_by("name")
+            .values_list("name", "stock_quantity")
+        ]
+
+    # The blocks are independent: look them up (and compute misses) concurrently
+    (
+        total_stock, sales_today, low_stock_count, shopkeepers_count, monthly_sales, stock_distribution,
+    ) = await asyncio.gather(
+        acached_block("total_stock", ["stock"], total_stock),
+        acached_block("sales_today", ["sales"], sales_today, suffix=today),
+        # Low stock alerts: products at or below their own reorder level
+        acached_block("low_stock_count", ["stock"], Product.objects.filter(below_reorder=True).acount),
+        acached_block("shopkeepers_count", ["users"], User.objects.filter(is_staff=False).acount),
+        acached_block("monthly_sales", ["sales"], monthly_sales, suffix=today),
+        acached_block("stock_distribution", ["stock", "catalog"], stock_distribution),
+    )
+
     sales_labels = [d.strftime("%b") for d in last_6_months]
-    sales_values = []
-    for d in last_6_months:
-        month_sales = (
-            Sale.objects.filter(date_sold__month=d.month, date_sold__year=d.year)
-            .aggregate(
-                total=Sum(
-                    ExpressionWrapper(F("quantity") * F("selling_price"), output_field=DecimalField())
-                )
-            )["total"] or 0
-        )
+    sales_values = [float(monthly_sales.get(d) or 0) for d in last_6_months]
 
-        sales_values.append(float(month_sales))
+    uncategorized = total_stock - sum(total for _, total in stock_distribution)
+    if uncategorized or not stock_distribution:
+        stock_distribution.append(("Uncategorized", uncategorized))
+    stock_labels = [name for name, _ in stock_distribution]
+    stock_values = [total for _, total in stock_distribution]
 
-    # Stock distribution (by category if Product has category field, else dummy)
-    stock_distribution = (
-        Product.objects.values("category__name")  # assuming category relation
-        .annotate(total=Sum("quantity"))
-    )
-    stock_labels = [item["category__name"] for item in stock_distribution] or ["Uncategorized"]
-    stock_values = [item["total"] for item in stock_distribution] or [0]
-    
     context = {
         "total_stock": total_stock,
         "sales_today": sales_today,
@@ -64,14 +133,13 @@ def admin_dashboard(request):
         "stock_labels": json.dumps(stock_labels),
         "stock_values": json.dumps(stock_values),
     }
-    return render(request, "admin/dashboard.html", context)
+    # Rendering touches request.user's role (a query): keep it off the event loop
+    return await sync_to_async(render)(request, "admin/dashboard.html", context)
 
 
 @login_required
+@query_budget(9, post=10)
 def stock_list(request):
-    products = Product.objects.all().order_by("name")
-    stock_entries = StockEntry.objects.select_related("product", "added_by").order_by("-date_added")
-
     # Handle create product
     if request.method == "POST" and "create_product" in request.POST:
         form = ProductForm(request.POST)
@@ -88,10 +156,19 @@ def stock_list(request):
             stock_entry.save()
             return redirect("inventory:stock")
 
+    # Only the page render reads the entries (and possibly the archive)
+    products = Product.objects.select_related("category", "forecast").order_by("name")
+    filter_form = StockEntryFilterForm(request.GET or None)
+    stock_entries = with_archive(filter_form, StockEntry).select_related("product", "added_by__role")
+    page = keyset_paginate(
+        stock_entries, "date_added",
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
 
     context = {
         "products": products,
-        "stock_entries": stock_entries,
+        "stock_entries": page,
+        "filter_form": filter_form,
         "form": ProductForm(),
         "stock_form": StockEntryForm()
     }
@@ -99,45 +176,156 @@ def stock_list(request):
 
 
 @login_required
+@query_budget(3, post=9)
+def stock_intake(request):
+    report = None
+
+    if request.method == "POST":
+        form = StockIntakeForm(request.POST, request.FILES)
+        if form.is_valid():
+            dry_run = form.cleaned_data["dry_run"]
+            try:
+                lines = parse_intake_csv(form.cleaned_data["csv_file"])
+                report = bulk_intake(lines, added_by=request.user, dry_run=dry_run)
+            except ValidationError as e:
+                messages.error(request, "⚠️ " + " | ".join(e.messages))
+            else:
+                if dry_run:
+                    messages.info(request, f"Dry run: {len(lines)} line(s) for {len(report)} product(s), nothing saved.")
+                else:
+                    messages.success(request, f"✅ Received {len(lines)} line(s) for {len(report)} product(s).")
+    else:
+        form = StockIntakeForm()
+
+    return render(request, "admin/stock_intake.html", {"form": form, "report": report})
+
+
+@login_required
+@query_budget(10)
+@reads_from_replica(max_staleness=300)
 def sales_report(request):
-    sales = Sale.objects.annotate(
-        profit_margin=ExpressionWrapper(
-            ((F("selling_price") - F("product__buying_price")) / F("selling_price")) * 100,
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        )
-    ).order_by("-date_sold")
-    
-    return render(request, "admin/sales_report.html", {"sales": sales})
+    filter_form = SaleFilterForm(request.GET or None)
+    sales = with_archive(filter_form, Sale)
+
+    page = keyset_paginate(
+        sales.select_related("product").annotate(
+            profit_margin=ExpressionWrapper(
+                ((F("selling_price") - F("cost_price_at_sale")) / F("selling_price")) * 100,
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            )
+        ),
+        "date_sold",
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
+
+    return render(request, "admin/sales_report.html", {
+        "sales": page,
+        "filter_form": filter_form,
+        "page_totals": _sales_totals(sales.model.objects.filter(pk__in=page.pks)),
+        "grand_totals": _sales_totals(sales),
+    })
+
+
+@login_required
+@query_budget(6)
+@reads_from_replica(max_staleness=300)
+def sales_pivot(request):
+    filter_form = SalesPivotForm(request.GET or None)
+    dimensions = filter_form.cleaned_data["dimensions"] if filter_form.is_valid() else []
+    queryset = filter_form.filter_queryset(DailySalesSummary.objects.all())
+    _, rows = build_sales_pivot(dimensions, queryset)
+
+    # Split each (level, *dimensions, *measures) tuple for the template
+    depth = len(dimensions)
+    return render(request, "admin/sales_pivot.html", {
+        "filter_form": filter_form,
+        "dimension_labels": [DIMENSIONS[name][0] for name in dimensions],
+        "rows": [(row[0], row[1:depth + 1], row[depth + 1:]) for row in rows],
+        "depth": depth,
+    })
+
+
+@login_required
+@query_budget(4)
+@reads_from_replica(max_staleness=900)
+def export_sales(request):
+    filter_form = SaleFilterForm(request.GET or None)
+    sales = with_archive(filter_form, Sale)
+    return _csv_response(export_sales_csv(sales), "sales")
+
+
+@login_required
+@query_budget(4)
+@reads_from_replica(max_staleness=900)
+def export_stock_entries(request):
+    filter_form = StockEntryFilterForm(request.GET or None)
+    entries = with_archive(filter_form, StockEntry)
+    return _csv_response(export_stock_entries_csv(entries), "stock-entries")
 
 
 @login_required
-def vendor_dashboard(request):
-    products = Product.objects.all()
-    today = now().date()
-
-    # Today's sales queryset
-    todays_sales_qs = Sale.objects.filter(
-        sold_by=request.user,
-        date_sold__date=today
+@query_budget(5)
+def restock_queue(request):
+    # Only flagged rows are read, through the partial restock index
+    queue = Product.objects.filter(below_reorder=True)
+    page = keyset_paginate(
+        queue.select_related("category"), "went_low_at",
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
+    totals = queue.aggregate(
+        products=Count("id"),
+        units=Sum("shortfall"),
+        cost=Sum(F("shortfall") * F("buying_price"), output_field=DecimalField(max_digits=14, decimal_places=2)),
     )
 
-    # Compute totals
-    todays_sales_count = todays_sales_qs.count()
-    todays_revenue = sum(float(s.total_sale_value) for s in todays_sales_qs) or 0
+    context = {
+        "products": page,
+        "totals": {key: value or 0 for key, value in totals.items()},
+    }
+    return render(request, "admin/restock.html", context)
+
+
+@login_required
+@query_budget(3)
+def export_purchase_order(request):
+    return _csv_response(export_purchase_order_csv(), "purchase-order")
+
+
+@login_required
+def cache_statistics(request):
+    return JsonResponse(cache_stats())
+
+
+@login_required
+@query_budget(5)
+async def vendor_dashboard(request):
+    user = request.user = await request.auser()
+    today = localdate()
 
-    # Weekly sales trend (ensure all values are floats)
+    # Weekly sales trend, one rollup read for all 7 days
     last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
-    daily_sales = []
-    for day in last_7_days:
-        sales_for_day = Sale.objects.filter(
-            sold_by=request.user,
-            date_sold__date=day
-        )
-        total_for_day = sum(float(s.total_sale_value) for s in sales_for_day) or 0
-        daily_sales.append(total_for_day)
-
-    return render(request, "vendor/index.html", {
-        "products_count": products.count(),
+
+    async def daily_totals():
+        return {
+            row["day"]: row
+            async for row in DailySalesSummary.objects.filter(vendor=user, day__gte=last_7_days[0])
+            .values("day")
+            .annotate(count=Sum("sales_count"), revenue=Sum("revenue"))
+        }
+
+    daily_totals, products_count = await asyncio.gather(
+        acached_block("vendor_daily_totals", ["sales"], daily_totals, suffix=f"{user.pk}:{today}"),
+        acached_block("products_count", ["catalog"], Product.objects.acount),
+    )
+    daily_sales = [float(daily_totals.get(d, {}).get("revenue") or 0) for d in last_7_days]
+
+    # Today's totals
+    todays = daily_totals.get(today, {})
+    todays_sales_count = todays.get("count") or 0
+    todays_revenue = float(todays.get("revenue") or 0)
+
+    return await sync_to_async(render)(request, "vendor/index.html", {
+        "products_count": products_count,
         "todays_sales_count": todays_sales_count,
         "todays_revenue": todays_revenue,
         "sales_trend_labels": json.dumps([d.strftime("%a") for d in last_7_days]),
@@ -146,11 +334,8 @@ def vendor_dashboard(request):
 
 
 @login_required
+@query_budget(9, post=12)
 def vendor_sales(request):
-    products = Product.objects.all().order_by("name")
-    sales = Sale.objects.filter(sold_by=request.user).order_by("-date_sold")
-    total_sales_amount = sum(s.total_sale_value for s in sales) or 0
-
     if request.method == "POST":
         form = SaleForm(request.POST)
         if form.is_valid():
@@ -182,12 +367,165 @@ def vendor_sales(request):
     else:
         form = SaleForm()
 
-    product_prices = {p.id: str(p.selling_price) for p in products}
+    filter_form = SaleFilterForm(request.GET or None)
+    del filter_form.fields["vendor"]  # always the current vendor
+    sales = with_archive(filter_form, Sale, sold_by=request.user)
+    page = keyset_paginate(
+        sales.select_related("product"), "date_sold",
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
 
     return render(request, "vendor/sales.html", {
-        "products": products,
-        "sales": sales,
-        "total_sales_amount": total_sales_amount,
+        "sales": page,
+        "filter_form": filter_form,
+        "page_totals": _sales_totals(sales.model.objects.filter(pk__in=page.pks)),
+        "total_sales_amount": _sales_totals(sales)["revenue"],
         "sale_form": form,
-        "product_prices": product_prices,
     })
+
+
+@login_required
+@query_budget(4, post=13)
+def vendor_checkout(request):
+    if request.method == "POST":
+        formset = BasketFormSet(request.POST)
+        checkout_form = CheckoutForm(request.POST)
+        if formset.is_valid() and checkout_form.is_valid():
+            lines = [form.cleaned_data for form in formset if form.cleaned_data]
+            try:
+                sales = Sale.checkout(
+                    lines,
+                    sold_by=request.user,
+                    payment_status=checkout_form.cleaned_data["payment_status"],
+                )
+                messages.success(request, f"✅ Checkout of {len(sales)} item(s) recorded successfully!")
+                return redirect("inventory:vendor_sales")
+            except ValidationError as e:
+                messages.error(request, "⚠️ Could not check out: " + " | ".join(e.messages))
+        else:
+            messages.error(request, "⚠️ Please fix the highlighted basket lines.")
+    else:
+        formset = BasketFormSet()
+        checkout_form = CheckoutForm()
+
+    return render(request, "vendor/checkout.html", {
+        "formset": formset,
+        "checkout_form": checkout_form,
+    })
+
+
+MAX_SYNC_BATCH = 500
+
+
+@require_POST
+@query_budget(post=13)
+def sync_sales(request):
+    """
+    JSON endpoint for offline POS clients: {"sales": [{"key", "product",
+    "quantity", "selling_price", "payment_status"}, ...]} in, one result per
+    line out. Keys make retries safe (see Sale.sync_batch). Like any POST
+    it is CSRF-protected: clients send the csrftoken cookie in X-CSRFToken.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+
+    try:
+        raw_lines = json.loads(request.body)["sales"]
+        if not isinstance(raw_lines, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": 'Expected a JSON object with a "sales" list.'}, status=400)
+    if len(raw_lines) > MAX_SYNC_BATCH:
+        return JsonResponse({"error": f"At most {MAX_SYNC_BATCH} sales per batch."}, status=400)
+
+    lines, invalid = [], {}
+    for index, raw in enumerate(raw_lines):
+        form = SaleSyncLineForm(raw if isinstance(raw, dict) else {})
+        if form.is_valid():
+            lines.append(form.cleaned_data)
+        else:
+            invalid[index] = {
+                "key": raw.get("key") if isinstance(raw, dict) else None,
+                "status": "rejected",
+                "errors": [f"{field}: {error}" for field, errors in form.errors.items() for error in errors],
+            }
+
+    try:
+        synced = iter(Sale.sync_batch(lines, sold_by=request.user))
+    except IntegrityError:
+        # A concurrent retry of the same batch got there first; nothing was written
+        return JsonResponse({"error": "The batch is already being synced, retry it."}, status=409)
+
+    results = [invalid[i] if i in invalid else next(synced) for i in range(len(raw_lines))]
+    counts = Counter(result["status"] for result in results)
+    return JsonResponse({
+        "results": results,
+        "created": counts["created"],
+        "duplicates": counts["duplicate"],
+        "rejected": counts["rejected"],
+    })
+
+
+CATALOG_FIELDS = ["id", "name", "buying_price", "selling_price", "quantity", "reorder_level"]
+
+
+@require_GET
+@query_budget(5)
+def catalog(request):
+    """
+    The product catalog as JSON, for clients that keep a local copy.
+
+    The ETag is the catalog version, so an unchanged catalog costs one
+    indexed lookup and a 304. With ?since=<version> only products written
+    after that version (and the ids of deleted ones) are returned; a client
+    stores the "version" of each response and passes it back next time.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+
+    since = request.GET.get("since", "")
+    if since and not since.isdigit():
+        return JsonResponse({"error": "since must be a catalog version."}, status=400)
+
+    version = CatalogVersion.current()
+    etag = f'"catalog-{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        # Writes committed after `version` was read are left for the next
+        # sync (since=version picks them up), so no transaction is needed
+        products = Product.objects.filter(catalog_version__lte=version).order_by("pk")
+        deletions = CatalogDeletion.objects.filter(catalog_version__lte=version)
+        # A version from the future means another database: start over
+        full = not since or int(since) > version
+        if full:
+            deletions = deletions.none()
+        else:
+            products = products.filter(catalog_version__gt=since)
+            deletions = deletions.filter(catalog_version__gt=since)
+        response = JsonResponse({
+            "version": version,
+            "full": full,
+            "products": list(products.values(*CATALOG_FIELDS)),
+            "deleted": list(deletions.values_list("product_id", flat=True)),
+        })
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+@query_budget(3)
+def product_search(request):
+    """
+    Top matches for the product autocomplete (inventory.search), with
+    price and stock: ?q=<text>&limit=<n>.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+
+    limit = request.GET.get("limit", "")
+    if limit and not limit.isdigit():
+        return JsonResponse({"error": "limit must be a number."}, status=400)
+    limit = min(int(limit or SEARCH_LIMIT), MAX_SEARCH_LIMIT)
+
+    return JsonResponse({"results": list(search_products(request.GET.get("q", ""), limit))})
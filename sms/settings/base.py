@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.SQLBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,6 +68,25 @@ TEMPLATES = [
 WSGI_APPLICATION = "sms.wsgi.application"
 
 
+# Database routing
+# Views marked @reads_from_replica read from the "reporting" alias when the
+# environment defines one; everything else uses "default" (core.replica).
+
+DATABASE_ROUTERS = ["core.replica.ReportingRouter"]
+
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Dashboard and catalog blocks are cached under versioned keys (inventory.cache).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "sms",
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -108,4 +128,27 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
-AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.User'
+
+# Logs in by email (or username, for the admin) and loads users with their role
+AUTHENTICATION_BACKENDS = ["users.backends.EmailBackend"]
+
+
+# Logging
+# Per-request SQL stats from core.middleware.SQLBudgetMiddleware are logged
+# at INFO; requests over their @query_budget at WARNING.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "sms.sql": {
+            "handlers": ["console"],
+            "level": config("SQL_LOG_LEVEL", default="WARNING"),
+            "propagate": False,
+        },
+    },
+}
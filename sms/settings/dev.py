@@ -16,7 +16,14 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Snapshot of default for reports; `manage.py refresh_replica` keeps it current
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-reporting.sqlite3',
+        'PRAGMAS': {'query_only': 1},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
 # Static/Media
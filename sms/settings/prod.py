@@ -1,14 +1,36 @@
 from .base import *
+from core.db import PRODUCTION_SQLITE, REPLICA_SQLITE
 
 DEBUG = False
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# WAL, busy timeout, persistent connections and BEGIN IMMEDIATE (see core.db);
+# `manage.py bench_sqlite` measures the difference. Reports, dashboards and
+# exports read from the "reporting" snapshot, refreshed by
+# `manage.py refresh_replica --every 30` (see core.replica).
 
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        **PRODUCTION_SQLITE,
+        "CONN_MAX_AGE": config("CONN_MAX_AGE", default=PRODUCTION_SQLITE["CONN_MAX_AGE"], cast=int),
+    },
+    "reporting": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db-reporting.sqlite3",
+        **REPLICA_SQLITE,
+    },
+}
+
+
+# File-based cache so every worker process sees the same invalidations
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
     }
 }
 
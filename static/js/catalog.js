@@ -0,0 +1,40 @@
+// Keeps a copy of the product catalog in localStorage and syncs it with
+// /inventory/api/catalog/: a 304 when nothing changed, otherwise only the
+// products written since the stored version.
+(function () {
+  const STORAGE_KEY = "catalog";
+
+  function stored() {
+    try {
+      return JSON.parse(localStorage.getItem(STORAGE_KEY)) || { version: null, products: {} };
+    } catch (e) {
+      return { version: null, products: {} };
+    }
+  }
+
+  window.loadCatalog = async function (url) {
+    const catalog = stored();
+    const headers = {};
+    let requestUrl = url;
+    if (catalog.version !== null) {
+      requestUrl += "?since=" + catalog.version;
+      headers["If-None-Match"] = `"catalog-${catalog.version}"`;
+    }
+
+    let response;
+    try {
+      response = await fetch(requestUrl, { headers: headers, credentials: "same-origin" });
+    } catch (e) {
+      return catalog.products; // offline: use what we have
+    }
+    if (!response.ok) return catalog.products; // 304 or an error
+
+    const delta = await response.json();
+    if (delta.full) catalog.products = {};
+    delta.products.forEach((product) => (catalog.products[product.id] = product));
+    delta.deleted.forEach((id) => delete catalog.products[id]);
+    catalog.version = delta.version;
+    localStorage.setItem(STORAGE_KEY, JSON.stringify(catalog));
+    return catalog.products;
+  };
+})();
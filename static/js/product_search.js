@@ -0,0 +1,94 @@
+// Product autocomplete for inventory.forms.ProductSearchInput: searches
+// /inventory/api/products/search/ as the user types and puts the chosen
+// product's id in the widget's hidden input, which then fires "change"
+// (with the product as event.detail) like a <select> would. Widgets added
+// to the page later are set up with attachProductSearch(element).
+(function () {
+  const DELAY_MS = 150;
+
+  function attach(container) {
+    const url = container.dataset.productSearch;
+    const hidden = container.querySelector('input[type="hidden"]');
+    const box = container.querySelector('input[type="search"]');
+    const list = container.querySelector(".list-group");
+    let results = [];
+    let timer = null;
+    let controller = null;
+
+    function close() {
+      list.classList.add("d-none");
+      list.replaceChildren();
+      results = [];
+    }
+
+    function choose(product) {
+      hidden.value = product.id;
+      box.value = product.name;
+      close();
+      hidden.dispatchEvent(new CustomEvent("change", { bubbles: true, detail: product }));
+    }
+
+    function item(product) {
+      const button = document.createElement("button");
+      button.type = "button";
+      button.className = "list-group-item list-group-item-action d-flex justify-content-between";
+      const name = document.createElement("span");
+      name.textContent = product.name;
+      const details = document.createElement("small");
+      details.className = product.quantity > 0 ? "text-muted" : "text-danger";
+      details.textContent = `KSh ${product.selling_price} · ${product.quantity} in stock`;
+      button.append(name, details);
+      // mousedown, before the search box's blur closes the list
+      button.addEventListener("mousedown", function (event) {
+        event.preventDefault();
+        choose(product);
+      });
+      return button;
+    }
+
+    async function search(text) {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const response = await fetch(url + "?q=" + encodeURIComponent(text), {
+          credentials: "same-origin",
+          signal: controller.signal,
+        });
+        if (!response.ok) return;
+        results = (await response.json()).results;
+      } catch (e) {
+        return; // replaced by a newer search, or offline
+      }
+      list.replaceChildren(...results.map(item));
+      list.classList.toggle("d-none", results.length === 0);
+    }
+
+    box.addEventListener("input", function () {
+      hidden.value = ""; // typing drops the previous choice
+      clearTimeout(timer);
+      const text = box.value.trim();
+      if (!text) {
+        close();
+        return;
+      }
+      timer = setTimeout(() => search(text), DELAY_MS);
+    });
+    box.addEventListener("keydown", function (event) {
+      if (event.key === "Enter" && results.length) {
+        event.preventDefault(); // pick the top match instead of submitting
+        choose(results[0]);
+      } else if (event.key === "Escape") {
+        close();
+      }
+    });
+    box.addEventListener("blur", close);
+  }
+
+  window.attachProductSearch = function (root) {
+    root.querySelectorAll("[data-product-search]").forEach(attach);
+  };
+
+  document.addEventListener("DOMContentLoaded", function () {
+    attachProductSearch(document);
+  });
+})();
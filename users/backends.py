@@ -0,0 +1,59 @@
+"""
+Authentication by email address.
+
+Logging in is one query on user_email_idx, with the role joined in, rather
+than a lookup by email followed by authenticate() looking the user up again
+by username. Every request's user comes with its role the same way, so
+is_admin / is_vendor and the users:dashboard redirect never query.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    ModelBackend that also accepts `email` instead of `username` (the
+    admin's login form still sends a username), and loads users with their
+    role.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if email is None:
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        if password is None:
+            return None
+        # Emails aren't unique: an address shared by two accounts logs into neither
+        users = list(self._users().filter(email=email)[:2])
+        if len(users) != 1:
+            # Hash once anyway, so response time doesn't reveal which emails exist (#20760)
+            UserModel().set_password(password)
+            return None
+        user = users[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, email=None, **kwargs):
+        return await sync_to_async(self.authenticate)(
+            request, username=username, password=password, email=email, **kwargs
+        )
+
+    def get_user(self, user_id):
+        try:
+            user = self._users().get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await self._users().aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    def _users(self):
+        return UserModel._default_manager.select_related("role")
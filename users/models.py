@@ -1,8 +1,36 @@
+import time
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 from core.utils import profile_image_upload
 
+# Other processes' Role edits reach this process's cache within this long
+ROLE_CACHE_SECONDS = 60
+
+
+class RoleManager(models.Manager):
+    """
+    Keeps the (small) roles table in memory, like ContentType's manager, so
+    role checks and user labels never query it. Cleared by users.signals on
+    any Role change in this process, and reloaded every ROLE_CACHE_SECONDS.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cache = {}
+        self._loaded_at = 0.0
+
+    def cached(self, pk):
+        """Role `pk` from the cache (None if there is no such role)."""
+        if pk not in self._cache or time.monotonic() - self._loaded_at > ROLE_CACHE_SECONDS:
+            self._cache = {role.pk: role for role in self.all()}
+            self._loaded_at = time.monotonic()
+        return self._cache.get(pk)
+
+    def clear_cache(self):
+        self._cache = {}
+
 
 class Role(models.Model):
     """
@@ -11,6 +39,8 @@ class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
     display_name = models.CharField(max_length=100)
 
+    objects = RoleManager()
+
     class Meta:
         verbose_name = "Role"
         verbose_name_plural = "Roles"
@@ -37,13 +67,38 @@ class User(AbstractUser):
     )
     bio = models.TextField(blank=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["email"], name="user_email_idx"),
+        ]
+
     def __str__(self):
-        return f"{self.username} ({self.role.display_name if self.role else 'No role'})"
+        role = self.cached_role
+        return f"{self.username} ({role.display_name if role else 'No role'})"
+
+    @property
+    def cached_role(self):
+        """The user's role without a query: the one loaded with the user, else the role cache."""
+        if self.role_id is None:
+            return None
+        if User.role.is_cached(self):
+            return self.role
+        return Role.objects.cached(self.role_id)
 
     def is_role(self, role_name):
         """Check if the user has a given role name (case-insensitive)."""
-        return self.role and self.role.name.lower() == role_name.lower()
-    
+        role = self.cached_role
+        return role is not None and role.name.lower() == role_name.lower()
+
+    @property
+    def home_url_name(self):
+        """Where the user lands after logging in, or None if their role has no dashboard."""
+        if self.is_admin:
+            return "inventory:admin_dashboard"
+        if self.is_vendor:
+            return "inventory:vendor_dashboard"
+        return None
+
     @property
     def is_admin(self):
         return self.is_role("admin")
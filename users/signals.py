@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+
+from .models import Role
+
+
+def clear_role_cache(sender, **kwargs):
+    Role.objects.clear_cache()
+
+
+post_save.connect(clear_role_cache, sender=Role, dispatch_uid="role-cache-save")
+post_delete.connect(clear_role_cache, sender=Role, dispatch_uid="role-cache-delete")
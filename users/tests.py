@@ -1,3 +1,61 @@
+from unittest import skipUnless
+
+from django.contrib.auth import authenticate
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from .models import Role, User
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+class QueryPlanTests(TestCase):
+    def test_login_email_lookup_uses_index(self):
+        plan = User.objects.filter(email="vendor@example.com").explain()
+        self.assertIn("USING INDEX user_email_idx", plan)
+
+
+class EmailLoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor_role = Role.objects.create(name="vendor", display_name="Vendor")
+        cls.vendor = User.objects.create_user(
+            username="vendor", email="vendor@example.com", password="pass", role=cls.vendor_role,
+        )
+
+    def test_authenticates_in_one_query_with_role(self):
+        with self.assertNumQueries(1):
+            user = authenticate(email="vendor@example.com", password="pass")
+            self.assertEqual(user, self.vendor)
+            self.assertTrue(user.is_vendor)
+            self.assertFalse(user.is_admin)
+        self.assertIsNone(authenticate(email="vendor@example.com", password="wrong"))
+        self.assertIsNone(authenticate(email="nobody@example.com", password="pass"))
+
+    def test_shared_email_logs_into_neither_account(self):
+        User.objects.create_user(username="other", email="vendor@example.com", password="pass")
+        self.assertIsNone(authenticate(email="vendor@example.com", password="pass"))
+
+    def test_username_login_still_works(self):
+        self.assertEqual(authenticate(username="vendor", password="pass"), self.vendor)
+
+    def test_login_goes_straight_to_role_dashboard(self):
+        response = self.client.post(reverse("users:login"), {"email": "vendor@example.com", "password": "pass"})
+        self.assertRedirects(response, reverse("inventory:vendor_dashboard"), fetch_redirect_response=False)
+
+    def test_dashboard_routing_loads_role_with_user(self):
+        self.client.force_login(self.vendor)
+        # The session, then the user joined to its role
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("users:dashboard"))
+        self.assertRedirects(response, reverse("inventory:vendor_dashboard"), fetch_redirect_response=False)
 
-# Create your tests here.
+    def test_role_cache_follows_role_changes(self):
+        user = User.objects.get(pk=self.vendor.pk)  # role not loaded
+        str(user)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(user), "vendor (Vendor)")
+            self.assertTrue(user.is_vendor)
+        self.vendor_role.display_name = "Shopkeeper"
+        self.vendor_role.save()
+        self.assertEqual(str(User.objects.get(pk=self.vendor.pk)), "vendor (Shopkeeper)")
@@ -40,17 +40,12 @@ def login_view(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
-        # Authenticate user using email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            messages.error(request, "Invalid email or password.")
-            return render(request, 'login.html')
-
-        user = authenticate(request, username=user.username, password=password)
+        # Authenticate user using email (users.backends.EmailBackend)
+        user = authenticate(request, email=email, password=password)
         if user is not None:
             login(request, user)
-            return redirect('users:dashboard')
+            # Straight to the role's dashboard, skipping the users:dashboard hop
+            return redirect(user.home_url_name or 'users:dashboard')
         else:
             messages.error(request, "Invalid email or password.")
             return render(request, 'login.html')
@@ -65,11 +60,10 @@ def logout_view(request):
 # Dashboard View
 @login_required
 def dashboard(request):
-    user = request.user
-    if user.is_role('admin'):
-        return redirect('inventory:admin_dashboard')
-    elif user.is_role('vendor'):
-        return redirect('inventory:vendor_dashboard')
+    # The role was loaded with request.user, so routing costs no queries
+    home = request.user.home_url_name
+    if home:
+        return redirect(home)
     else:
         messages.error(request, "Invalid role. Please contact the administrator.")
         return redirect('users:logout')